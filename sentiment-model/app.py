@@ -1,11 +1,49 @@
 import os
-from flask import Flask, jsonify, request
-from views import get_para_sentiments, get_sentence_sentiments
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+import hmac
+import json
+import time
+from flask import Flask, Response, g, jsonify, request, stream_with_context
+from backends import MODEL_NAME, ModelLoader, ModelNotReady
+from batcher import DynamicBatcher
+from cascade import CascadeScorer
+from jobs import JobManager, JobNotFound, RetryLater
+from metrics import CONTENT_TYPE, SIZE_BUCKETS, TOKEN_BUCKETS, Registry, Timer
+from prediction_cache import PredictionCache
+from predictor import MAX_LENGTH, predict_scores
+from views import (analyzer, get_cache_stats, get_para_sentiment, get_para_sentiments, get_sentence_sentiment,
+                   get_sentence_sentiments, reload_overlay, start_pool)
 
 app = Flask(__name__)
 
+metrics = Registry()
+REQUEST_SECONDS = metrics.histogram("sentiment_request_duration_seconds",
+                                    "Request latency (time to first byte for streams)", ["route", "method", "status"])
+REQUEST_TEXTS = metrics.histogram("sentiment_request_texts", "Texts per request", ["route"], SIZE_BUCKETS)
+TEXTS_SCORED = metrics.counter("sentiment_texts_scored_total", "Texts scored, by model; rate() gives texts/sec",
+                               ["model"])
+STAGE_SECONDS = metrics.histogram("bert_stage_duration_seconds",
+                                  "BERT time per stage: tokenize, pad and forward per batch, serialize per request",
+                                  ["stage"])
+BERT_BATCH_TEXTS = metrics.histogram("bert_batch_texts", "Texts per coalesced BERT batch", buckets=SIZE_BUCKETS)
+BERT_BATCH_TOKENS = metrics.histogram("bert_batch_tokens", "Real (unpadded) tokens per coalesced BERT batch",
+                                      buckets=TOKEN_BUCKETS)
+
+def count_texts(model, count):
+    g.texts = g.get("texts", 0) + count
+    TEXTS_SCORED.inc(model, amount=count)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route, request.method, str(response.status_code))
+    if "texts" in g:
+        REQUEST_TEXTS.observe(g.texts, route)
+    return response
+
 @app.route('/', methods=['GET'])
 def index():
     data = "Hello World"
@@ -19,6 +57,7 @@ def para_sentiment_analyze():
             return jsonify({"error": "Input must be a list of strings"}), 400
 
         sentiments = get_para_sentiments(data)
+        count_texts("vader", len(data))
         return jsonify(sentiments)
 
     except Exception as e:
@@ -32,43 +71,330 @@ def sentence_sentiment_analyze():
             return jsonify({"error": "Input must be a list of strings"}), 400
 
         sentiments = get_sentence_sentiments(data)
+        count_texts("vader", len(data))
         return jsonify(sentiments)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-model_name = "nlptown/bert-base-multilingual-uncased-sentiment"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
+def ndjson_scores(lines, score):
+    """
+    One result line per non-blank NDJSON record: a JSON string, or an object
+    with a "text" string and an optional "id" that is echoed back. A bad
+    record yields an error line instead of ending the stream.
+    """
+    index = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        result = {"index": index}
+        try:
+            record = json.loads(line)
+            if isinstance(record, dict):
+                if "id" in record:
+                    result["id"] = record["id"]
+                record = record.get("text")
+            if not isinstance(record, str):
+                raise ValueError('Record must be a string or an object with a "text" string')
+            result["score"] = score(record)
+        except Exception as e:
+            result["error"] = str(e)
+        index += 1
+        yield json.dumps(result) + "\n"
+
+def ndjson_response(score):
+    def counted(text):
+        value = score(text)
+        TEXTS_SCORED.inc("vader")
+        return value
+
+    # read the body line by line while writing results, so neither side is held in memory
+    lines = ndjson_scores(request.stream, counted)
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+@app.route('/sentence-sentiment-analyze/stream', methods=['POST'])
+def sentence_sentiment_analyze_stream():
+    return ndjson_response(get_sentence_sentiment)
+
+@app.route('/para-sentiment-analyze/stream', methods=['POST'])
+def para_sentiment_analyze_stream():
+    return ndjson_response(get_para_sentiment)
+
+@app.route('/admin/reload-lexicon', methods=['POST'])
+def reload_lexicon():
+    # disabled unless ADMIN_TOKEN is configured
+    admin_token = os.environ.get("ADMIN_TOKEN")
+    if not admin_token:
+        return jsonify({"error": "Not found"}), 404
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(), admin_token.encode()):
+        return jsonify({"error": "Invalid admin token"}), 403
+    try:
+        return jsonify({"status": "success", **reload_overlay()})
+    except Exception as e:
+        return jsonify({"error": "Lexicon reload failed", "details": str(e)}), 500
+
+# fork the VADER workers while this is still the only thread; threads start from here on
+start_pool()
+
+# BERT_BACKEND picks fp32 torch (default), dynamic int8 or ONNX Runtime, see backends.py.
+# BERT_LOAD: "background" loads it in a thread at boot, "lazy" on the first prediction,
+# "eager" before the app starts serving. VADER routes never wait for it.
+BERT_LOAD = os.environ.get("BERT_LOAD", "background")
+# how long a prediction waits for a model that is still loading before answering 503
+BERT_WAIT_SECONDS = float(os.environ.get("BERT_WAIT_SECONDS", 30))
 
-model.eval()
+bert = ModelLoader()
+if BERT_LOAD in ("background", "eager"):
+    bert.start()
+if BERT_LOAD == "eager":
+    bert.get()
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model.to(device)
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "alive"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    # ready as soon as VADER can serve; ?model=bert also waits for the transformer
+    vader_ready = analyzer.lexicon is not None
+    bert_status = bert.status()
+    ready = vader_ready and (request.args.get("model") != "bert" or bert.ready)
+    body = {"status": "ready" if ready else "not_ready", "vader": vader_ready, "bert": bert_status}
+    return jsonify(body), 200 if ready else 503
+
+# concurrent /predict_sentiment calls are coalesced into shared forward passes
+def run_bert_batch(texts):
+    scores, stats = predict_scores(texts, *bert.get())
+    BERT_BATCH_TEXTS.observe(len(texts))
+    BERT_BATCH_TOKENS.observe(stats["tokens"])
+    for stage in ("tokenize", "pad", "forward"):
+        STAGE_SECONDS.observe(stats[stage + "_seconds"], stage)
+    return scores, stats
+
+batcher = DynamicBatcher(run_bert_batch,
+                         max_batch_size=int(os.environ.get("BERT_MAX_BATCH_ITEMS", 256)),
+                         max_delay=float(os.environ.get("BERT_BATCH_DELAY_MS", 5)) / 1000)
+
+# repeated headlines skip tokenization and the forward pass; BERT_CACHE_PATH adds a SQLite copy
+# keyed by backend, model and BERT_MAX_LENGTH (truncation changes the scores of long texts),
+# holding at most BERT_CACHE_DISK_ROWS predictions (least recently used ones are dropped)
+BERT_CACHE_SIZE = int(os.environ.get("BERT_CACHE_SIZE", 10000))
+BERT_CACHE_DISK_ROWS = int(os.environ.get("BERT_CACHE_DISK_ROWS", 200000))
+prediction_cache = PredictionCache(BERT_CACHE_SIZE, os.environ.get("BERT_CACHE_PATH") or None,
+                                   version="{0}:{1}:{2}".format(bert.status()["backend"], MODEL_NAME, MAX_LENGTH),
+                                   max_rows=BERT_CACHE_DISK_ROWS) \
+    if BERT_CACHE_SIZE else None
+
+def predict_with_cache(paragraphs):
+    """
+    Scores for `paragraphs` in order. Duplicates within the request are
+    predicted once and cached predictions are reused; only the rest goes
+    through the batcher.
+    """
+    if prediction_cache is None:
+        scores, stats = batcher.submit(paragraphs)
+        return scores, dict(stats, cache_hits=0, unique=len(paragraphs))
+
+    keys = [PredictionCache.key(paragraph) for paragraph in paragraphs]
+    unique = {}
+    for key, paragraph in zip(keys, paragraphs):
+        unique.setdefault(key, paragraph)
+    found = prediction_cache.get_many(unique)
+    missing = [key for key in unique if key not in found]
+
+    scores, stats = batcher.submit([unique[key] for key in missing])
+    prediction_cache.put_many(zip(missing, scores))
+    found.update(zip(missing, scores))
+    return [found[key] for key in keys], dict(stats, cache_hits=len(unique) - len(missing), unique=len(unique))
 
 @app.route('/predict_sentiment', methods=['POST'])
 def predict_sentiment():
     try:
         paragraphs = request.get_json()
 
-        if not paragraphs or not isinstance(paragraphs, list):
+        if not paragraphs or not isinstance(paragraphs, list) or not all(isinstance(p, str) for p in paragraphs):
             return jsonify({"error": "Please provide a plain array of paragraphs"}), 400
 
-        inputs = tokenizer(paragraphs, return_tensors="pt", padding=True, truncation=True)
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            predictions = torch.argmax(logits, dim=1)
+        try:
+            bert.get(timeout=BERT_WAIT_SECONDS)
+        except ModelNotReady as e:
+            response = jsonify({"error": str(e), "bert": bert.status()})
+            response.headers["Retry-After"] = "5"
+            return response, 503
 
-        scores = [round(((pred.item() + 1) - 3) / 2, 3) for pred in predictions]
+        scores, stats = predict_with_cache(paragraphs)
+        count_texts("bert", len(paragraphs))
 
-        return jsonify(scores)
+        with Timer(STAGE_SECONDS, "serialize"):
+            response = jsonify(scores)
+        response.headers["X-Batch-Count"] = str(stats["batches"])
+        response.headers["X-Padding-Ratio"] = str(stats["padding_ratio"])
+        response.headers["X-Coalesced-Requests"] = str(stats["requests"])
+        response.headers["X-Cache-Hits"] = str(stats["cache_hits"])
+        response.headers["X-Unique-Texts"] = str(stats["unique"])
+        return response
 
     except Exception as e:
         return jsonify({"error": "Prediction failed", "details": str(e)}), 500
 
+# VADER answers the clear-cut texts; only |compound| < CASCADE_BAND goes on to BERT
+CASCADE_BAND = float(os.environ.get("CASCADE_BAND", 0.3))
+cascade = CascadeScorer(get_para_sentiments, lambda texts: predict_with_cache(texts)[0], band=CASCADE_BAND)
+
+def bert_ready():
+    # True once BERT is loaded, waiting at most BERT_WAIT_SECONDS for it
+    try:
+        bert.get(timeout=BERT_WAIT_SECONDS)
+        return True
+    except ModelNotReady:
+        return False
+
+@app.route('/cascade-sentiment-analyze', methods=['POST'])
+def cascade_sentiment_analyze():
+    try:
+        data = request.get_json()
+        if not isinstance(data, list) or not all(isinstance(item, str) for item in data):
+            return jsonify({"error": "Input must be a list of strings"}), 400
+        try:
+            band = float(request.args.get("band", CASCADE_BAND))
+        except ValueError:
+            return jsonify({"error": "band must be a number"}), 400
+
+        # a model that is not ready in time leaves the ambiguous texts with their VADER score
+        use_bert = bert_ready()
+        results = cascade.score(data, band=band, use_bert=use_bert)
+        routed = sum(1 for result in results if result["model"] == "bert")
+        count_texts("vader", len(results) - routed)
+        count_texts("bert", routed)
+
+        response = jsonify(results)
+        response.headers["X-Routed-To-Bert"] = str(routed)
+        response.headers["X-Bert-Available"] = "true" if use_bert else "false"
+        return response
+
+    except Exception as e:
+        return jsonify({"error": "Cascade scoring failed", "details": str(e)}), 500
+
+@app.route('/cascade-sentiment-analyze/stats', methods=['GET'])
+def cascade_stats():
+    return jsonify(cascade.stats())
+
+# large backfills run as background jobs persisted to JOBS_DB_PATH, instead of one long request
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", "jobs.db")
+JOBS_PAGE_SIZE = 1000
+def score_bert_job(texts):
+    if not bert_ready():
+        raise RetryLater("BERT model is not ready")
+    return predict_with_cache(texts)[0]
+
+def score_cascade_job(texts):
+    return cascade.score(texts, use_bert=bert_ready())
+
+jobs = JobManager(JOBS_DB_PATH,
+                  {"vader": get_para_sentiments,
+                   "bert": score_bert_job,
+                   "cascade": score_cascade_job},
+                  workers=int(os.environ.get("JOBS_WORKERS", 1)),
+                  batch_size=int(os.environ.get("JOBS_BATCH_SIZE", 256)))
+
+def read_job_file(upload):
+    """
+    Texts of an uploaded file: a JSON array of strings or of records with a
+    "text" or "title", or else one text per non-blank line
+    """
+    content = upload.read().decode("utf-8")
+    if content.lstrip().startswith("["):
+        records = json.loads(content)
+        return [record.get("text", record.get("title")) if isinstance(record, dict) else record
+                for record in records]
+    return [line.strip() for line in content.splitlines() if line.strip()]
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        scorer = request.args.get("scorer", "vader")
+        if scorer not in jobs.scorers:
+            return jsonify({"error": "scorer must be one of {0}".format(", ".join(jobs.scorers))}), 400
+        if "file" in request.files:
+            texts = read_job_file(request.files["file"])
+        else:
+            texts = request.get_json(silent=True)
+        if not texts or not isinstance(texts, list) or not all(isinstance(item, str) for item in texts):
+            return jsonify({"error": "Provide a non-empty list of strings, or a file"}), 400
+
+        job_id = jobs.submit(texts, scorer)
+        response = jsonify({"job_id": job_id, "status_url": "/jobs/" + job_id,
+                            "results_url": "/jobs/{0}/results".format(job_id)})
+        response.headers["Location"] = "/jobs/" + job_id
+        return response, 202
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Job submission failed", "details": str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    try:
+        return jsonify(jobs.status(job_id))
+    except JobNotFound:
+        return jsonify({"error": "Unknown job"}), 404
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = min(JOBS_PAGE_SIZE, max(1, int(request.args.get("limit", JOBS_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    try:
+        job, results = jobs.results(job_id, offset, limit)
+    except JobNotFound:
+        return jsonify({"error": "Unknown job"}), 404
+    next_offset = offset + len(results) if offset + len(results) < job["total"] else None
+    return jsonify({"job_id": job_id, "state": job["state"], "total": job["total"], "done": job["done"],
+                    "offset": offset, "results": results, "next_offset": next_offset})
+
+@metrics.collector
+def collect_service_metrics():
+    # read at scrape time from the objects that already keep these numbers
+    bert_status = bert.status()
+    caches = dict(("vader_" + name, stats) for name, stats in get_cache_stats().items() if stats is not None)
+    if prediction_cache is not None:
+        caches["bert"] = prediction_cache.stats()
+    cascade_stats = cascade.stats()
+    return [
+        ("bert_model_ready", "gauge", "1 once the BERT model is loaded and warmed up",
+         [({}, 1 if bert.ready else 0)]),
+        ("bert_model_load_seconds", "gauge", "Seconds spent loading the BERT model",
+         [({"backend": bert_status["backend"]}, bert_status["load_seconds"])]),
+        ("bert_model_warmup_seconds", "gauge", "Seconds spent on the BERT warm-up prediction",
+         [({"backend": bert_status["backend"]}, bert_status["warmup_seconds"])]),
+        ("sentiment_cache_hits_total", "counter", "Cache hits",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("sentiment_cache_misses_total", "counter", "Cache misses",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+        ("sentiment_cache_hit_ratio", "gauge", "Cache hits over lookups since start",
+         [({"cache": name}, stats["hit_rate"]) for name, stats in caches.items()]),
+        ("sentiment_cache_entries", "gauge", "Entries held in the cache",
+         [({"cache": name}, stats["size"]) for name, stats in caches.items()]),
+        ("bert_batcher_batches_total", "counter", "Forward batches run by the dynamic batcher",
+         [({}, batcher.batches)]),
+        ("bert_batcher_requests_total", "counter", "Requests coalesced into those batches",
+         [({}, batcher.requests)]),
+        ("cascade_texts_total", "counter", "Texts scored by the cascade", [({}, cascade_stats["texts"])]),
+        ("cascade_routed_to_bert_total", "counter", "Cascade texts routed to BERT",
+         [({}, cascade_stats["routed_to_bert"])]),
+        ("cascade_bert_fraction", "gauge", "Share of cascade texts routed to BERT",
+         [({}, cascade_stats["bert_fraction"])]),
+    ]
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 8080))
+    jobs.start()
     app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Inference backends for the BERT sentiment model.
+
+Selected with BERT_BACKEND:
+
+    torch   fp32 PyTorch, on GPU when one is available (default)
+    int8    PyTorch with dynamic INT8 quantization of the Linear layers (CPU)
+    onnx    ONNX Runtime session over an exported copy of the model (CPU)
+
+Every backend returns a model that is called like the transformers one,
+``model(**inputs).logits``, so `predictor.predict_scores` works unchanged.
+The ONNX export is written to BERT_ONNX_PATH the first time it is needed and
+reused afterwards.
+
+`ModelLoader` loads the backend off the request path (in a background thread
+at boot, or on first use) so that the VADER routes do not wait for it.
+"""
+import os
+import time
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from predictor import predict_scores
+
+MODEL_NAME = "nlptown/bert-base-multilingual-uncased-sentiment"
+BACKENDS = ("torch", "int8", "onnx")
+ONNX_PATH = os.environ.get("BERT_ONNX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "models", "bert-sentiment.onnx"))
+
+
+class OnnxSentimentModel(object):
+    """
+    ONNX Runtime session behind the ``model(**inputs).logits`` interface
+    """
+
+    def __init__(self, path, threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = set(i.name for i in self.session.get_inputs())
+
+    def __call__(self, **inputs):
+        feed = dict((name, tensor.cpu().numpy()) for name, tensor in inputs.items() if name in self.input_names)
+        # the predictor only pads input_ids and attention_mask; older exports also take segment ids
+        if "token_type_ids" in self.input_names and "token_type_ids" not in feed:
+            feed["token_type_ids"] = np.zeros_like(feed["input_ids"])
+        logits = self.session.run(["logits"], feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+    def to(self, device):
+        return self
+
+    def eval(self):
+        return self
+
+
+def export_onnx(model, tokenizer, path):
+    """
+    Export `model` to ONNX with dynamic batch and sequence axes, taking the
+    inputs `predictor.predict_scores` passes (input_ids, attention_mask)
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask"]
+    axes = dict((name, {0: "batch", 1: "sequence"}) for name in names)
+    axes["logits"] = {0: "batch"}
+    tmp_path = "{0}.{1}.tmp".format(path, os.getpid())
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in names), tmp_path, input_names=names,
+                          output_names=["logits"], dynamic_axes=axes, opset_version=14)
+    os.replace(tmp_path, path)
+
+
+def load_model(backend=None, model_name=MODEL_NAME):
+    """
+    (tokenizer, model, device) for the requested backend
+    """
+    backend = backend or os.environ.get("BERT_BACKEND", "torch")
+    if backend not in BACKENDS:
+        raise ValueError("Unknown BERT_BACKEND {0!r}, expected one of {1}".format(backend, ", ".join(BACKENDS)))
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "onnx":
+        if not os.path.exists(ONNX_PATH):
+            export_onnx(AutoModelForSequenceClassification.from_pretrained(model_name).eval(), tokenizer, ONNX_PATH)
+        return tokenizer, OnnxSentimentModel(ONNX_PATH), torch.device("cpu")
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    if backend == "int8":
+        # quantized kernels are CPU only
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return tokenizer, model, torch.device("cpu")
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    return tokenizer, model, device
+
+
+class ModelNotReady(Exception):
+    pass
+
+
+class ModelLoader(object):
+    """
+    Loads (tokenizer, model, device) once, in a background thread, then runs
+    a warm-up prediction. `get` starts the load if nobody has yet and waits
+    for it; a failed load is retried by the next `start` or `get`.
+    """
+
+    def __init__(self, backend=None, warmup_texts=("Bitcoin is looking great today",)):
+        self.backend = backend
+        self.warmup_texts = list(warmup_texts)
+        self.state = "not_loaded"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._model = None
+        self._thread = None
+        self._loaded = threading.Event()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            start = time.perf_counter()
+            tokenizer, model, device = load_model(self.backend)
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            start = time.perf_counter()
+            predict_scores(self.warmup_texts, tokenizer, model, device)
+            self.warmup_seconds = round(time.perf_counter() - start, 3)
+            self._model = (tokenizer, model, device)
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+        finally:
+            self._loaded.set()
+
+    def start(self):
+        """
+        Begin loading in the background (no-op if loading or loaded)
+        """
+        with self._lock:
+            if self.state in ("not_loaded", "failed"):
+                self.state = "loading"
+                self.error = None
+                self._loaded.clear()
+                self._thread = threading.Thread(target=self._load, name="bert-loader", daemon=True)
+                self._thread.start()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def get(self, timeout=None):
+        """
+        (tokenizer, model, device), waiting up to `timeout` seconds for the
+        load; raises ModelNotReady if it does not finish in time
+        """
+        if self.state != "ready":
+            self.start()
+        if not self._loaded.wait(timeout):
+            raise ModelNotReady("Model is still loading")
+        if self.state == "failed":
+            raise ModelNotReady("Model failed to load: {0}".format(self.error))
+        return self._model
+
+    def status(self):
+        return {"state": self.state,
+                "backend": self.backend or os.environ.get("BERT_BACKEND", "torch"),
+                "load_seconds": self.load_seconds,
+                "warmup_seconds": self.warmup_seconds,
+                "error": self.error}
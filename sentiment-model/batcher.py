@@ -0,0 +1,96 @@
+"""
+Cross-request dynamic batching for model inference.
+
+Concurrent requests hand their inputs to one `DynamicBatcher`. A single
+worker thread waits for the first pending request, keeps collecting further
+requests until `max_delay` has passed or `max_batch_size` inputs are
+waiting, runs one forward pass over the combined inputs and gives each
+caller back its own slice of the results. Under load the batches fill up
+well before the delay expires; at low load a request waits at most
+`max_delay` for company.
+"""
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class DynamicBatcher(object):
+    """
+    Coalesces `submit` calls from many threads into calls of
+    `run_batch(items) -> (results, stats)`, where `results` has one entry per item.
+    """
+
+    def __init__(self, run_batch, max_batch_size=256, max_delay=0.005):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._carry = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="dynamic-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, items):
+        """
+        Run `items` as part of the next batch; blocks until done and returns
+        (results for `items`, stats of the batch they ran in)
+        """
+        items = list(items)
+        if not items:
+            return [], {"batches": 0, "padding_ratio": 0.0, "requests": 0}
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((items, future))
+        return future.result()
+
+    def _next_request(self, timeout=None):
+        if self._carry is not None:
+            request, self._carry = self._carry, None
+            return request
+        return self._queue.get(timeout=timeout)
+
+    def _collect(self):
+        pending = [self._next_request()]
+        count = len(pending[0][0])
+        deadline = time.monotonic() + self.max_delay
+        while count < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if count + len(request[0]) > self.max_batch_size:
+                # too big to join this batch; it starts the next one
+                self._carry = request
+                break
+            pending.append(request)
+            count += len(request[0])
+        return pending
+
+    def _loop(self):
+        while True:
+            pending = self._collect()
+            items = [item for request_items, _ in pending for item in request_items]
+            try:
+                results, stats = self.run_batch(items)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(pending)
+            stats = dict(stats, requests=len(pending))
+            start = 0
+            for request_items, future in pending:
+                future.set_result((results[start:start + len(request_items)], stats))
+                start += len(request_items)
@@ -0,0 +1,247 @@
+"""
+Micro-benchmarks for the VADER engine.
+
+Scores synthetic corpora shaped like the traffic we see (short tweets, long
+Reddit selftext, emoji-heavy posts and ALL-CAPS rants) and times the whole
+pipeline plus the stages it is made of. Results are written as JSON and
+compared with a stored baseline; any timing more than `--tolerance` slower
+than the baseline is reported and makes the run exit with status 1.
+
+Shared CI hosts speed up and slow down as a whole, so every run also times a
+fixed pure-Python calibration workload alongside the stages, and baseline
+timings are rescaled by the ratio of the two calibration times before they
+are compared.
+
+    python benchmark.py                      # run and compare with benchmark_baseline.json
+    python benchmark.py --output out.json    # also keep the results
+    python benchmark.py --update-baseline    # record this machine's numbers as the baseline
+
+Numbers are only comparable on the same machine, so refresh the baseline
+whenever the benchmark host changes.
+"""
+import gc
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+from vader.vaderSentiment import SentimentIntensityAnalyzer, SentiText
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_TOLERANCE = 0.3
+# slowdowns smaller than this are timer and scheduler noise, whatever the ratio
+DEFAULT_MIN_DELTA_US = 1.0
+
+CRYPTO_WORDS = ["btc", "eth", "sol", "doge", "coin", "token", "wallet", "exchange", "fees", "gas",
+                "hodl", "dip", "pump", "dump", "moon", "whale", "chart", "bull", "bear", "market"]
+FILLER_WORDS = ["the", "a", "is", "it", "to", "and", "of", "i", "this", "that", "was", "on", "for",
+                "but", "not", "very", "no", "never", "so", "kind", "least", "really", "just"]
+EMOJIS = ["\U0001F680", "\U0001F315", "\U0001F48E", "\U0001F525", "\U0001F602", "\U0001F62D",
+          "\U0001F4C8", "\U0001F4C9", "\U0001F923", "\U0001F44D", "❤️", "\U0001F921"]
+
+
+def _words(rng, lexicon_words, count):
+    words = []
+    for _ in range(count):
+        r = rng.random()
+        if r < 0.3:
+            words.append(rng.choice(lexicon_words))
+        elif r < 0.5:
+            words.append(rng.choice(CRYPTO_WORDS))
+        else:
+            words.append(rng.choice(FILLER_WORDS))
+    return words
+
+
+def _sentences(rng, lexicon_words, count, min_words=6, max_words=20):
+    sentences = []
+    for _ in range(count):
+        words = _words(rng, lexicon_words, rng.randint(min_words, max_words))
+        sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"]))
+    return " ".join(sentences)
+
+
+def make_corpora(size=500, seed=0):
+    """
+    Deterministic synthetic corpora: {name: [text, ...]}
+    """
+    rng = random.Random(seed)
+    lexicon_words = sorted(SentimentIntensityAnalyzer().lexicon)[::9]
+    tweets = []
+    for _ in range(size):
+        words = _words(rng, lexicon_words, rng.randint(6, 30))
+        words.insert(rng.randint(0, len(words)), "$" + rng.choice(CRYPTO_WORDS[:4]).upper())
+        if rng.random() < 0.3:
+            words.append(rng.choice(EMOJIS))
+        tweets.append(" ".join(words))
+    selftext = [_sentences(rng, lexicon_words, rng.randint(15, 40)) for _ in range(max(1, size // 20))]
+    emoji_heavy = []
+    for _ in range(size):
+        words = _words(rng, lexicon_words, rng.randint(5, 15))
+        for _ in range(rng.randint(3, 10)):
+            words.insert(rng.randint(0, len(words)), "".join(rng.choice(EMOJIS) for _ in range(rng.randint(1, 3))))
+        emoji_heavy.append(" ".join(words))
+    caps_rants = []
+    for _ in range(size):
+        words = [w.upper() if rng.random() < 0.8 else w for w in _words(rng, lexicon_words, rng.randint(8, 25))]
+        caps_rants.append(" ".join(words) + "!" * rng.randint(1, 6))
+    return {"tweets": tweets, "selftext": selftext, "emoji_heavy": emoji_heavy, "caps_rants": caps_rants}
+
+
+def _best_times(stages, repeat):
+    """
+    Best wall time of each stage; the repeats are interleaved so that a noisy
+    moment on the host does not land on a single stage
+    """
+    best = dict((name, float("inf")) for name in stages)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for name, fn in stages.items():
+                start = time.perf_counter()
+                fn()
+                best[name] = min(best[name], time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best
+
+
+def _calibration_workload(words=tuple("the quick brown fox jumps over the lazy dog".split()) * 2000):
+    # tokenizing and dict probing, the same kind of work the engine does
+    seen = {}
+    for word in words:
+        key = word.lower().strip(".,!?")
+        seen[key] = seen.get(key, 0) + 1
+    return seen
+
+
+def bench_corpus(analyzer, texts, repeat=7):
+    """
+    Best-of-`repeat` timings for one corpus: texts/sec for the full pipeline
+    and microseconds per text for each stage
+    """
+    translated = [analyzer._translate_emojis(text).strip() for text in texts]
+    sentitexts = [SentiText(text) for text in translated]
+    valences = [analyzer._sentiments(text)[0] for text in texts]
+    but_inputs = [(st.words_and_emoticons_lower, list(v)) for st, v in zip(sentitexts, valences)]
+
+    stages = {
+        "polarity_scores": lambda: [analyzer.polarity_scores(text) for text in texts],
+        "compound_score": lambda: [analyzer.compound_score(text) for text in texts],
+        "translate_emojis": lambda: [analyzer._translate_emojis(text) for text in texts],
+        "SentiText": lambda: [SentiText(text) for text in translated],
+        "but_check": lambda: [analyzer._but_check(words, list(v)) for words, v in but_inputs],
+        "calibration": _calibration_workload,
+    }
+    best = _best_times(stages, repeat)
+    calibration_us = round(best.pop("calibration") * 1e6, 3)
+    per_text_us = dict((name, round(seconds / len(texts) * 1e6, 3)) for name, seconds in best.items())
+    return {"texts": len(texts),
+            "texts_per_sec": round(1e6 / per_text_us["polarity_scores"], 1),
+            "calibration_us": calibration_us,
+            "per_text_us": per_text_us}
+
+
+def run(size=1000, repeat=7, seed=0):
+    # no cache: repeated runs over the same corpus would only measure lookups
+    analyzer = SentimentIntensityAnalyzer(cache_size=0)
+    corpora = make_corpora(size, seed)
+    return {"python": platform.python_version(),
+            "machine": platform.machine(),
+            "size": size,
+            "seed": seed,
+            "corpora": dict((name, bench_corpus(analyzer, texts, repeat)) for name, texts in corpora.items())}
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta_us=DEFAULT_MIN_DELTA_US):
+    """
+    Timings in `results` more than `tolerance` (a fraction) and `min_delta_us`
+    slower than in `baseline`, as a list of (corpus, stage, baseline us, current us).
+    Baseline timings are first scaled to the speed of the current host.
+    """
+    regressions = []
+    for corpus, base in baseline.get("corpora", {}).items():
+        current = results["corpora"].get(corpus)
+        if current is None:
+            continue
+        scale = _host_scale(current, base)
+        for stage, base_us in base["per_text_us"].items():
+            base_us = round(base_us * scale, 3)
+            now_us = current["per_text_us"].get(stage)
+            if now_us is not None and now_us > base_us * (1 + tolerance) and now_us - base_us >= min_delta_us:
+                regressions.append((corpus, stage, base_us, now_us))
+    return regressions
+
+
+def _host_scale(current, base):
+    """
+    How much slower the current host ran the calibration workload than the baseline host
+    """
+    if current.get("calibration_us") and base.get("calibration_us"):
+        return current["calibration_us"] / base["calibration_us"]
+    return 1.0
+
+
+def report(results, baseline=None):
+    lines = []
+    for corpus, stats in results["corpora"].items():
+        lines.append("{0} ({1} texts): {2:.0f} texts/sec".format(corpus, stats["texts"], stats["texts_per_sec"]))
+        for stage, us in stats["per_text_us"].items():
+            line = "    {0:<18} {1:>10.2f} us/text".format(stage, us)
+            if baseline and corpus in baseline.get("corpora", {}):
+                base = baseline["corpora"][corpus]
+                base_us = base["per_text_us"].get(stage)
+                if base_us:
+                    base_us *= _host_scale(stats, base)
+                    line += "  ({0:+.0%} vs baseline)".format(us / base_us - 1)
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the VADER engine against a stored baseline.")
+    parser.add_argument("--size", type=int, default=1000, help="texts per corpus (selftext uses size / 20)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown per timing as a fraction (default: %(default)s)")
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US,
+                        help="ignore slowdowns smaller than this many microseconds per text (default: %(default)s)")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.size, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(report(results))
+        print("Baseline written to {0}".format(args.baseline))
+        return 0
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(report(results, baseline))
+    if baseline is None:
+        print("No baseline at {0}; run with --update-baseline to record one".format(args.baseline))
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_us)
+    for corpus, stage, base_us, now_us in regressions:
+        print("REGRESSION {0}/{1}: {2:.2f} -> {3:.2f} us/text".format(corpus, stage, base_us, now_us))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+Resumable offline BERT scoring of the historical news corpus.
+
+Reads a JSON array of {"id", "title", ...} records (the neondb crypto news
+dump) incrementally, scores the titles in-process with the length-bucketed
+predictor and appends id,title,score rows to a CSV as it goes. After every
+chunk the CSV is flushed and a small checkpoint (records done, CSV size) is
+written next to it, so an interrupted run picks up where it stopped:
+
+    python bulk_score.py neondb_public_crypto_news.json scores.csv
+    python bulk_score.py neondb_public_crypto_news.json scores.csv --backend int8 --chunk-size 4096
+
+A CSV that does not match its checkpoint (deleted, truncated, or written
+without one) is never resumed or overwritten silently; `--restart` scores
+from the beginning and replaces it. Progress and titles/sec are reported on
+stderr.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+FIELDS = ["id", "title", "score"]
+
+
+def iter_json_array(f, read_size=1 << 16):
+    """
+    Yield the elements of the JSON array in file `f` one at a time,
+    holding only the element being parsed in memory
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # skip whitespace and the array punctuation between elements
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,[":
+            if buffer[pos] == "[":
+                if started:
+                    break
+                started = True
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        if pos < len(buffer):
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # a number or literal cut off at the end of the buffer may still continue
+                if end < len(buffer) or eof:
+                    yield value
+                    pos = end
+                    continue
+            except ValueError:
+                if eof:
+                    raise
+        if eof:
+            if buffer[pos:].strip():
+                raise ValueError("Unexpected end of JSON array")
+            return
+        chunk = f.read(read_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def read_checkpoint(output_path):
+    """
+    {"records", "bytes"} of the last finished chunk, or None without a checkpoint
+    """
+    try:
+        with open(output_path + CHECKPOINT_SUFFIX) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(output_path, records, size):
+    path = output_path + CHECKPOINT_SUFFIX
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"records": records, "bytes": size}, f)
+    os.replace(tmp_path, path)
+
+
+def score_file(input_path, output_path, score_batch, chunk_size=2048, report=None, restart=False):
+    """
+    Score every title of `input_path` into `output_path` with
+    `score_batch(titles) -> scores`, resuming from the checkpoint if there is
+    one (or starting over with `restart`). Returns the number of records
+    scored by this run; raises ValueError when the CSV and checkpoint disagree.
+    """
+    if restart and os.path.exists(output_path + CHECKPOINT_SUFFIX):
+        os.remove(output_path + CHECKPOINT_SUFFIX)
+    checkpoint = read_checkpoint(output_path)
+    size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+    if checkpoint is None:
+        if size and not restart:
+            raise ValueError("{0} already has data but no checkpoint; pass --restart to overwrite it".format(
+                output_path))
+        checkpoint = {"records": 0, "bytes": 0}
+    elif size < checkpoint["bytes"]:
+        raise ValueError("{0} is shorter ({1} bytes) than its checkpoint ({2} bytes); pass --restart to score "
+                         "from the beginning".format(output_path, size, checkpoint["bytes"]))
+    done = checkpoint["records"]
+    started = time.perf_counter()
+    scored = 0
+
+    with open(input_path, "r", encoding="utf-8") as source, \
+            open(output_path, "a+", newline="", encoding="utf-8") as out:
+        # drop rows written after the last checkpoint (a crash mid-chunk)
+        out.truncate(checkpoint["bytes"])
+        out.seek(checkpoint["bytes"])
+        writer = csv.DictWriter(out, fieldnames=FIELDS, extrasaction="ignore")
+        if checkpoint["bytes"] == 0:
+            writer.writeheader()
+
+        records = iter_json_array(source)
+        end = object()
+        for skipped in range(done):
+            if next(records, end) is end:
+                raise ValueError("{0} has only {1} records but the checkpoint says {2} were scored; was the "
+                                 "input replaced?".format(input_path, skipped, done))
+
+        while True:
+            chunk = [record for _, record in zip(range(chunk_size), records)]
+            if not chunk:
+                break
+            scores = score_batch([record["title"] for record in chunk])
+            writer.writerows({**record, "score": score} for record, score in zip(chunk, scores))
+            out.flush()
+            os.fsync(out.fileno())
+            done += len(chunk)
+            scored += len(chunk)
+            write_checkpoint(output_path, done, out.tell())
+            if report is not None:
+                report(done, scored / (time.perf_counter() - started))
+    return scored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score news titles with BERT into a CSV, resumably.")
+    parser.add_argument("input", help='JSON array of records with a "title"')
+    parser.add_argument("output", help="CSV to append id,title,score rows to")
+    parser.add_argument("--backend", default=None, help="torch, int8 or onnx (default: BERT_BACKEND or torch)")
+    parser.add_argument("--chunk-size", type=int, default=2048, help="titles scored between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and overwrite the output")
+    args = parser.parse_args(argv)
+
+    from backends import load_model
+    from predictor import predict_scores
+
+    tokenizer, model, device = load_model(args.backend)
+
+    def score_batch(titles):
+        return predict_scores(titles, tokenizer, model, device)[0]
+
+    def report(done, rate):
+        sys.stderr.write("{0} titles scored ({1:.1f} titles/sec)\n".format(done, rate))
+
+    started = time.perf_counter()
+    try:
+        scored = score_file(args.input, args.output, score_batch, args.chunk_size, report, args.restart)
+    except ValueError as e:
+        sys.stderr.write("error: {0}\n".format(e))
+        return 2
+    elapsed = time.perf_counter() - started
+    rate = scored / elapsed if elapsed else 0.0
+    print("Scored {0} titles in {1:.1f}s ({2:.1f} titles/sec) into {3}".format(scored, elapsed, rate, args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+VADER-first cascade scoring.
+
+Every text is scored with the VADER engine first. Only the ambiguous ones,
+whose compound score lies inside the band (-band, band) around zero, are sent
+on to BERT; clearly positive or negative posts keep their VADER score. Each
+result records which model produced it, and the scorer keeps running totals
+of how many texts were routed to BERT.
+"""
+import threading
+
+
+class CascadeScorer(object):
+    """
+    Cascades `vader_scores(texts) -> scores` into
+    `bert_scores(texts) -> scores` for texts with |compound| < `band`
+    """
+
+    def __init__(self, vader_scores, bert_scores, band=0.3):
+        self.vader_scores = vader_scores
+        self.bert_scores = bert_scores
+        self.band = band
+        self.texts = 0
+        self.routed = 0
+        self._lock = threading.Lock()
+
+    def is_ambiguous(self, compound, band=None):
+        band = self.band if band is None else band
+        return abs(compound) < band
+
+    def score(self, texts, band=None, use_bert=True):
+        """
+        [{"score", "model"}] for `texts` in order. With `use_bert` False the
+        ambiguous texts keep their VADER score (and are not counted as routed).
+        """
+        texts = list(texts)
+        compounds = self.vader_scores(texts)
+        results = [{"score": compound, "model": "vader"} for compound in compounds]
+        ambiguous = [idx for idx, compound in enumerate(compounds) if self.is_ambiguous(compound, band)]
+        if use_bert and ambiguous:
+            scores = self.bert_scores([texts[idx] for idx in ambiguous])
+            for idx, score in zip(ambiguous, scores):
+                results[idx] = {"score": score, "model": "bert"}
+        with self._lock:
+            self.texts += len(texts)
+            if use_bert:
+                self.routed += len(ambiguous)
+        return results
+
+    def stats(self):
+        with self._lock:
+            fraction = round(self.routed / self.texts, 4) if self.texts else 0.0
+            return {"band": self.band, "texts": self.texts, "routed_to_bert": self.routed,
+                    "bert_fraction": fraction}
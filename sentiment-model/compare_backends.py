@@ -0,0 +1,122 @@
+"""
+Agreement and speed check of the BERT inference backends.
+
+Scores a fixed corpus of crypto posts with every backend in backends.py and
+compares each one with the fp32 PyTorch reference: the share of texts that
+get the same star rating, the mean absolute score difference, per-request
+latency (p50/p95) and throughput. Exits with status 1 when a backend agrees
+with the reference on fewer than `--min-agreement` of the texts.
+
+    python compare_backends.py
+    python compare_backends.py --backends torch int8 --output backends.json
+"""
+import sys
+import json
+import time
+import argparse
+
+from backends import BACKENDS, load_model
+from predictor import predict_scores
+
+CORPUS = [
+    "Bitcoin breaks above $70k as ETF inflows hit a new record",
+    "Ethereum gas fees are insane again, I can't even move my tokens",
+    "This exchange froze withdrawals and support is ignoring everyone",
+    "Solana network back online after a five hour outage",
+    "Just bought my first sats, feeling good about the long term",
+    "Another rug pull. Devs vanished with 3M in liquidity",
+    "Regulators approve the spot ETF, huge day for the industry",
+    "Market is flat today, nothing interesting happening",
+    "Lost half my portfolio in the crash, worst week ever",
+    "The new wallet update is smooth and the fees are tiny",
+    "Is it too late to buy? Prices look stretched to me",
+    "Mining difficulty adjusts upward for the third time this month",
+    "Scammers are impersonating the team on Telegram, be careful",
+    "Staking rewards finally landed, pretty happy with the yield",
+    "Honestly this coin has no use case and the team is shady",
+    "Layer 2 adoption keeps growing, transactions are fast and cheap",
+    "Hackers drained the bridge, users are furious",
+    "I'm neutral on this one, waiting to see the roadmap",
+    "Great AMA from the founders, very transparent answers",
+    "Exchange listing delayed again, the community is losing patience",
+    "El precio de bitcoin sube con fuerza esta semana",
+    "Die Börse hat Auszahlungen gestoppt, sehr enttäuschend",
+    "Le marché des cryptos est très calme aujourd'hui",
+    "Ottimo progetto, il team lavora benissimo",
+    "HODL! Best investment I've ever made",
+    "Terrible customer service, my account has been locked for weeks",
+    "Fees are fine, confirmations are fine, nothing special",
+    "This is the bottom, accumulate while everyone is scared",
+    "Whales are dumping and retail is left holding the bag",
+    "The whitepaper is well written and the tech looks solid",
+    "Not sure about this token, the tokenomics look off",
+    "Absolutely love the new staking dashboard",
+    "Network congestion made my transfer take six hours",
+    "Partnership announced with a major payments company",
+    "Price went sideways all day, boring",
+    "They promised a mainnet launch months ago and delivered nothing",
+] * 4
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def run_backend(backend, texts, request_size=8, repeat=3):
+    tokenizer, model, device = load_model(backend)
+    predict_scores(texts[:request_size], tokenizer, model, device)
+
+    scores, _ = predict_scores(texts, tokenizer, model, device)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for offset in range(0, len(texts), request_size):
+            request_start = time.perf_counter()
+            predict_scores(texts[offset:offset + request_size], tokenizer, model, device)
+            latencies.append(time.perf_counter() - request_start)
+    elapsed = time.perf_counter() - start
+    return scores, {"texts_per_sec": round(repeat * len(texts) / elapsed, 1),
+                    "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                    "p95_ms": round(_percentile(latencies, 95) * 1000, 2)}
+
+
+def agreement(reference, scores):
+    same = sum(1 for a, b in zip(reference, scores) if a == b)
+    diff = sum(abs(a - b) for a, b in zip(reference, scores)) / len(reference)
+    return round(same / len(reference), 4), round(diff, 4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare BERT inference backends with the fp32 reference.")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--request-size", type=int, default=8, help="texts per simulated request")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    # the fp32 run is the reference, so it always goes first
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    reference = None
+    results = {}
+    failed = False
+    for backend in backends:
+        scores, stats = run_backend(backend, CORPUS, args.request_size, args.repeat)
+        if reference is None:
+            reference = scores
+        stats["agreement"], stats["mean_abs_diff"] = agreement(reference, scores)
+        results[backend] = stats
+        failed = failed or stats["agreement"] < args.min_agreement
+        print("{0:<6} agreement {1:.1%}  mean |diff| {2:.3f}  {3:>8.1f} texts/sec  p50 {4:.1f} ms  p95 {5:.1f} ms".format(
+            backend, stats["agreement"], stats["mean_abs_diff"], stats["texts_per_sec"], stats["p50_ms"],
+            stats["p95_ms"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
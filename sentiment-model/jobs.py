@@ -0,0 +1,163 @@
+"""
+Asynchronous bulk scoring jobs.
+
+A job is a list of texts and the name of a scorer. `JobManager.submit`
+stores the texts in a local SQLite file and returns a job id straight away;
+a small pool of worker threads scores queued jobs `batch_size` texts at a
+time and writes every finished batch back in one transaction, so progress can
+be polled while the job runs and results read page by page. On `start` jobs
+left queued or running by a previous process are picked up again from their
+first unscored text, so a restart only repeats the batch that was in flight.
+A scorer that cannot run yet (e.g. the model is still loading) raises
+`RetryLater`; the job is queued again after `retry_delay` seconds and keeps
+the batches it has already finished.
+"""
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobNotFound(Exception):
+    pass
+
+
+class RetryLater(Exception):
+    pass
+
+
+class JobManager(object):
+    """
+    Runs jobs with `scorers[name](texts) -> scores`; a scorer may also return
+    {"score", "model"} dicts (the cascade), in which case the model is kept per text
+    """
+
+    def __init__(self, path, scorers, workers=1, batch_size=256, retry_delay=5.0):
+        self.path = path
+        self.scorers = scorers
+        self.workers = workers
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """
+        Open the store, requeue unfinished jobs and start the workers (no-op if started)
+        """
+        with self._start_lock:
+            if self._db is not None:
+                return
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            with db:
+                db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, scorer TEXT NOT NULL, "
+                           "state TEXT NOT NULL, total INTEGER NOT NULL, done INTEGER NOT NULL, error TEXT, "
+                           "created REAL NOT NULL, updated REAL NOT NULL)")
+                db.execute("CREATE TABLE IF NOT EXISTS job_items (job_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+                           "text TEXT NOT NULL, score REAL, model TEXT, PRIMARY KEY (job_id, idx))")
+            self._db = db
+            for (job_id,) in db.execute("SELECT id FROM jobs WHERE state IN (?, ?) ORDER BY created",
+                                        (QUEUED, RUNNING)).fetchall():
+                self._queue.put(job_id)
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._loop, name="scoring-job-{0}".format(number), daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, texts, scorer):
+        """
+        Store a job for `texts` and queue it; returns the job id
+        """
+        if scorer not in self.scorers:
+            raise ValueError("Unknown scorer {0!r}, expected one of {1}".format(scorer, ", ".join(self.scorers)))
+        self.start()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._db_lock, self._db:
+            self._db.execute("INSERT INTO jobs (id, scorer, state, total, done, created, updated) "
+                             "VALUES (?, ?, ?, ?, 0, ?, ?)", (job_id, scorer, QUEUED, len(texts), now, now))
+            self._db.executemany("INSERT INTO job_items (job_id, idx, text) VALUES (?, ?, ?)",
+                                 ((job_id, idx, text) for idx, text in enumerate(texts)))
+        self._queue.put(job_id)
+        return job_id
+
+    def status(self, job_id):
+        self.start()
+        with self._db_lock:
+            row = self._db.execute("SELECT id, scorer, state, total, done, error, created, updated FROM jobs "
+                                   "WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFound(job_id)
+        job = dict(zip(("id", "scorer", "state", "total", "done", "error", "created", "updated"), row))
+        job["progress"] = round(job["done"] / job["total"], 4) if job["total"] else 1.0
+        return job
+
+    def results(self, job_id, offset=0, limit=1000):
+        """
+        Page of [{"index", "score", "model"}] for texts offset..offset+limit;
+        texts not scored yet have a null score
+        """
+        job = self.status(job_id)
+        with self._db_lock:
+            rows = self._db.execute("SELECT idx, score, model FROM job_items WHERE job_id = ? AND idx >= ? "
+                                    "ORDER BY idx LIMIT ?", (job_id, offset, limit)).fetchall()
+        return job, [{"index": idx, "score": score, "model": model} for idx, score, model in rows]
+
+    def _set_state(self, job_id, state, error=None):
+        with self._db_lock, self._db:
+            self._db.execute("UPDATE jobs SET state = ?, error = ?, updated = ? WHERE id = ?",
+                             (state, error, time.time(), job_id))
+
+    def _loop(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self.run(job_id)
+            except RetryLater as e:
+                self._set_state(job_id, QUEUED, str(e))
+                timer = threading.Timer(self.retry_delay, self._queue.put, (job_id,))
+                timer.daemon = True
+                timer.start()
+            except Exception as e:
+                self._set_state(job_id, FAILED, str(e))
+
+    def run(self, job_id):
+        """
+        Score the unscored texts of `job_id` batch by batch
+        """
+        scorer = self.scorers[self.status(job_id)["scorer"]]
+        self._set_state(job_id, RUNNING)
+        while True:
+            with self._db_lock:
+                rows = self._db.execute("SELECT idx, text FROM job_items WHERE job_id = ? AND score IS NULL "
+                                        "ORDER BY idx LIMIT ?", (job_id, self.batch_size)).fetchall()
+            if not rows:
+                break
+            results = scorer([text for _, text in rows])
+            updates = []
+            for (idx, _), result in zip(rows, results):
+                if isinstance(result, dict):
+                    updates.append((result["score"], result["model"], job_id, idx))
+                else:
+                    updates.append((result, None, job_id, idx))
+            with self._db_lock, self._db:
+                self._db.executemany("UPDATE job_items SET score = ?, model = ? WHERE job_id = ? AND idx = ?",
+                                     updates)
+                self._db.execute("UPDATE jobs SET done = done + ?, updated = ? WHERE id = ?",
+                                 (len(updates), time.time(), job_id))
+        self._set_state(job_id, DONE)
+
+    def close(self):
+        with self._start_lock, self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,156 @@
+"""
+Minimal Prometheus instrumentation for the sentiment service.
+
+Counters and histograms are plain Python objects updated under one short
+lock: an observation is a bisect over the bucket bounds and two additions,
+so instrumenting the request path costs a few microseconds. Values that
+already live elsewhere (cache stats, model load times, cascade totals) are
+not duplicated; a collector callback reads them when `/metrics` is scraped.
+`Registry.render` produces the Prometheus text exposition format (0.0.4).
+"""
+import time
+import bisect
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = ('{0}="{1}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+               for name, value in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def render(self):
+        lines = ["# HELP {0} {1}".format(self.name, self.documentation), "# TYPE {0} counter".format(self.name)]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append("{0}{1} {2}".format(self.name, _format_labels(self.labelnames, labelvalues),
+                                                 _format_value(value)))
+        return lines
+
+
+class Histogram(object):
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][idx] += 1
+            series[1] += value
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        lines = ["# HELP {0} {1}".format(self.name, self.documentation), "# TYPE {0} histogram".format(self.name)]
+        with self._lock:
+            series = sorted((labelvalues, list(counts), total) for labelvalues, (counts, total) in self._series.items())
+        for labelvalues, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, [("le", _format_value(bound))])
+                lines.append("{0}_bucket{1} {2}".format(self.name, labels, cumulative))
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append("{0}_sum{1} {2}".format(self.name, labels, _format_value(float(total))))
+            lines.append("{0}_count{1} {2}".format(self.name, labels, cumulative))
+        return lines
+
+
+class Registry(object):
+    """
+    Metrics of one process. `collector(fn)` registers a callback returning
+    (name, type, documentation, [(labels dict, value)]) tuples, read at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append("# HELP {0} {1}".format(name, documentation))
+                lines.append("# TYPE {0} {1}".format(name, kind))
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append("{0}{1} {2}".format(name, _format_labels(labels.keys(), labels.values()),
+                                                     _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+class Timer(object):
+    """
+    ``with Timer(histogram, *labels):`` observes the elapsed seconds
+    """
+
+    def __init__(self, histogram, *labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
@@ -0,0 +1,112 @@
+"""
+Content-hash keyed cache of BERT predictions.
+
+Headlines are keyed by a BLAKE2 digest of their normalized text. The model
+is uncased and splits on whitespace, so case and spacing differences cannot
+change its output and are folded away before hashing; "Bitcoin  hits $70k"
+and "bitcoin hits $70K" share one entry. The in-memory layer is a
+size-bounded LRU (`vader.cache.ScoreCache`); with a `path` every prediction
+is also written through to a SQLite file that survives restarts and is
+consulted on memory misses. The file is bounded too: rows record when they
+were last written or read from disk, and past `max_rows` the least recently
+used ones are deleted. Entries carry the backend, model and truncation
+length they were computed with, so switching BERT_BACKEND or BERT_MAX_LENGTH
+never serves stale scores.
+"""
+import time
+import sqlite3
+import threading
+
+from vader.cache import ScoreCache
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+class PredictionCache(object):
+    """
+    BERT scores keyed by normalized-text digest: an in-memory LRU in front of
+    an optional, row-bounded SQLite file, both scoped to `version`.
+    """
+
+    def __init__(self, maxsize=10000, path=None, version="", max_rows=100000):
+        self.version = version
+        self.memory = ScoreCache(maxsize)
+        self.path = path
+        self.max_rows = max_rows
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self._db = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute("CREATE TABLE IF NOT EXISTS predictions "
+                                 "(key BLOB PRIMARY KEY, version TEXT NOT NULL, score REAL NOT NULL, "
+                                 "used REAL NOT NULL DEFAULT 0)")
+                columns = [row[1] for row in self._db.execute("PRAGMA table_info(predictions)")]
+                if "used" not in columns:
+                    # files written before the disk layer was bounded
+                    self._db.execute("ALTER TABLE predictions ADD COLUMN used REAL NOT NULL DEFAULT 0")
+                self._db.execute("CREATE INDEX IF NOT EXISTS predictions_used ON predictions (used)")
+
+    @staticmethod
+    def key(text):
+        return ScoreCache.key(normalize(text), "bert")
+
+    def get_many(self, keys):
+        """
+        {key: score} for the keys that are cached, in memory or on disk
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            score = self.memory.get(key, self.version)
+            if score is None:
+                missing.append(key)
+            else:
+                found[key] = score
+        if missing and self._db is not None:
+            with self._db_lock:
+                for key in missing:
+                    row = self._db.execute("SELECT score FROM predictions WHERE key = ? AND version = ?",
+                                           (key, self.version)).fetchone()
+                    if row is not None:
+                        found[key] = row[0]
+                        self.disk_hits += 1
+                        self.memory.put(key, row[0], self.version)
+                if found:
+                    with self._db:
+                        self._db.executemany("UPDATE predictions SET used = ? WHERE key = ?",
+                                             [(time.time(), key) for key in missing if key in found])
+        return found
+
+    def put_many(self, items):
+        """
+        Store (key, score) pairs
+        """
+        items = list(items)
+        for key, score in items:
+            self.memory.put(key, score, self.version)
+        if items and self._db is not None:
+            now = time.time()
+            with self._db_lock, self._db:
+                self._db.executemany("INSERT OR REPLACE INTO predictions (key, version, score, used) "
+                                     "VALUES (?, ?, ?, ?)", [(key, self.version, score, now) for key, score in items])
+                if self.max_rows:
+                    excess = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.max_rows
+                    if excess > 0:
+                        self._db.execute("DELETE FROM predictions WHERE key IN "
+                                         "(SELECT key FROM predictions ORDER BY used LIMIT ?)", (excess,))
+                        self.disk_evictions += excess
+
+    def stats(self):
+        return dict(self.memory.stats(), disk_hits=self.disk_hits, disk_evictions=self.disk_evictions,
+                    persistent=self._db is not None)
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,85 @@
+"""
+Length-bucketed batch inference for the BERT sentiment model.
+
+Tokenizing a whole request with ``padding=True`` pads every title to the
+longest post in the request and runs it as one tensor. Instead the inputs are
+tokenized once without padding, sorted by token length and cut into batches
+that respect both a batch size and a token budget (rows x padded length), so
+short texts are only ever padded to their neighbours' length. Results are
+put back in input order.
+"""
+import os
+import time
+import torch
+
+MAX_LENGTH = int(os.environ.get("BERT_MAX_LENGTH", 512))
+BATCH_SIZE = int(os.environ.get("BERT_BATCH_SIZE", 32))
+TOKEN_BUDGET = int(os.environ.get("BERT_TOKEN_BUDGET", 8192))
+
+
+def length_buckets(lengths, batch_size=BATCH_SIZE, token_budget=TOKEN_BUDGET):
+    """
+    Split item indices into batches of similar length. Each batch has at most
+    `batch_size` items and, padded to its longest item, at most `token_budget`
+    tokens (a single item longer than the budget still gets its own batch).
+    """
+    order = sorted(range(len(lengths)), key=lambda idx: lengths[idx])
+    batches = []
+    batch = []
+    for idx in order:
+        # items are sorted, so the newest one sets the padded length of the batch
+        if batch and (len(batch) == batch_size or (len(batch) + 1) * lengths[idx] > token_budget):
+            batches.append(batch)
+            batch = []
+        batch.append(idx)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def to_score(prediction):
+    # 1-5 stars to [-1, 1]
+    return round(((prediction + 1) - 3) / 2, 3)
+
+
+def predict_scores(texts, tokenizer, model, device, max_length=MAX_LENGTH, batch_size=BATCH_SIZE,
+                   token_budget=TOKEN_BUDGET):
+    """
+    Sentiment score of every text, in input order, plus batching stats:
+    {"batches": number of forward passes, "padding_ratio": share of padded tokens,
+    "tokens": real tokens, "tokenize_seconds", "pad_seconds", "forward_seconds"}
+    """
+    start = time.perf_counter()
+    encodings = tokenizer(list(texts), truncation=True, max_length=max_length)
+    input_ids = encodings["input_ids"]
+    attention_mask = encodings["attention_mask"]
+    lengths = [len(ids) for ids in input_ids]
+
+    scores = [None] * len(lengths)
+    batches = length_buckets(lengths, batch_size, token_budget)
+    padded_tokens = 0
+    tokenize_seconds = time.perf_counter() - start
+    pad_seconds = forward_seconds = 0.0
+    for batch in batches:
+        start = time.perf_counter()
+        padded_tokens += len(batch) * max(lengths[idx] for idx in batch)
+        inputs = tokenizer.pad({"input_ids": [input_ids[idx] for idx in batch],
+                                "attention_mask": [attention_mask[idx] for idx in batch]},
+                               padding=True, return_tensors="pt")
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+        pad_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = model(**inputs)
+            predictions = torch.argmax(outputs.logits, dim=1)
+
+        for idx, pred in zip(batch, predictions):
+            scores[idx] = to_score(pred.item())
+        forward_seconds += time.perf_counter() - start
+
+    real_tokens = sum(lengths)
+    padding_ratio = round(1 - real_tokens / padded_tokens, 4) if padded_tokens else 0.0
+    return scores, {"batches": len(batches), "padding_ratio": padding_ratio, "tokens": real_tokens,
+                    "tokenize_seconds": tokenize_seconds, "pad_seconds": pad_seconds,
+                    "forward_seconds": forward_seconds}
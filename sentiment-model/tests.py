@@ -73,16 +73,24 @@ def test_sentence_sentiment_analyze_invalid_input(client):
     assert response.get_json()["error"] == "Input must be a list of strings"
 
 # 6. Test predict_sentiment success
-@patch('app.tokenizer')
-@patch('app.model')
-def test_predict_sentiment_success(mock_model, mock_tokenizer, client):
-    # Mock tokenizer output properly
+@patch('app.bert')
+def test_predict_sentiment_success(mock_bert, client):
+    mock_tokenizer = MagicMock()
+    mock_model = MagicMock()
+    mock_bert.get.return_value = (mock_tokenizer, mock_model, "cpu")
+
+    # Mock tokenizer output properly: unpadded ids first, then the padded batch tensors
+    mock_tokenizer.return_value = {
+        "input_ids": [[101, 2023, 102], [101, 2071, 2022, 102]],
+        "attention_mask": [[1, 1, 1], [1, 1, 1, 1]]
+    }
+
     mock_input_ids = MagicMock()
     mock_attention_mask = MagicMock()
     mock_input_ids.to.return_value = mock_input_ids
     mock_attention_mask.to.return_value = mock_attention_mask
 
-    mock_tokenizer.return_value = {
+    mock_tokenizer.pad.return_value = {
         "input_ids": mock_input_ids,
         "attention_mask": mock_attention_mask
     }
@@ -97,9 +105,875 @@ def test_predict_sentiment_success(mock_model, mock_tokenizer, client):
     scores = response.get_json()
     assert isinstance(scores, list)
     assert len(scores) == 2
+    assert response.headers["X-Batch-Count"] == "1"
+    assert response.headers["X-Padding-Ratio"] == "0.125"
 
 # 7. Test predict_sentiment invalid input
 def test_predict_sentiment_invalid_input(client):
     response = client.post('/predict_sentiment', json={"text": "this should be a list"})
     assert response.status_code == 400
     assert "Please provide a plain array" in response.get_json()["error"]
+
+# 8. Test the compiled lexicon snapshot is rebuilt when a source lexicon changes
+def test_lexicon_snapshot_tracks_source_edits(tmp_path):
+    import os
+    from vader.lexicon_snapshot import load_lexicons, snapshot_path_for
+
+    lexicon_path = tmp_path / "lexicon.txt"
+    emoji_path = tmp_path / "emoji.txt"
+    lexicon_path.write_text("hodl\t1.5\t0.5\t[1, 2]\nrekt\t-2.5\t0.5\t[-2, -3]\n", encoding="utf-8")
+    emoji_path.write_text("\U0001F680\trocket\n", encoding="utf-8")
+
+    lexicon, emojis = load_lexicons(str(lexicon_path), str(emoji_path))
+    assert lexicon == {"hodl": 1.5, "rekt": -2.5}
+    assert emojis == {"\U0001F680": "rocket"}
+    assert os.path.exists(snapshot_path_for(str(lexicon_path)))
+
+    lexicon_path.write_text("hodl\t2.0\t0.5\t[2, 2]\n", encoding="utf-8")
+    os.utime(lexicon_path, ns=(0, 0))
+    lexicon, _ = load_lexicons(str(lexicon_path), str(emoji_path))
+    assert lexicon == {"hodl": 2.0}
+
+# 9. Test the analyzer scores identically from the snapshot and the raw lexicon files
+def test_analyzer_snapshot_matches_text_lexicon():
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    from_snapshot = SentimentIntensityAnalyzer()
+    from_text = SentimentIntensityAnalyzer(use_snapshot=False)
+    assert from_snapshot.lexicon == from_text.lexicon
+    assert from_snapshot.emojis == from_text.emojis
+    text = "HODL is VERY smart, but rekt is not fun 💘"
+    assert from_snapshot.polarity_scores(text) == from_text.polarity_scores(text)
+
+# 10. Test polarity_scores against a golden corpus recorded from the original rule engine
+GOLDEN_SELFTEXT = " ".join(["I have been holding since 2017 and this market is brutal.",
+                            "Every time I buy the dip it dips more, which is really frustrating.",
+                            "Still, the fundamentals look good and adoption keeps growing.",
+                            "Fees are lower than ever and the community is amazing 😍"] * 60)
+
+GOLDEN_SCORES = [
+    ('VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!', {'neg': 0.0, 'neu': 0.294, 'pos': 0.706, 'compound': 0.9469}),
+    ('VADER is not smart, handsome, nor funny.', {'neg': 0.646, 'neu': 0.354, 'pos': 0.0, 'compound': -0.7424}),
+    ("At least it isn't a horrible book.", {'neg': 0.0, 'neu': 0.678, 'pos': 0.322, 'compound': 0.431}),
+    ('The book was only kind of good.', {'neg': 0.0, 'neu': 0.697, 'pos': 0.303, 'compound': 0.3832}),
+    ('The plot was good, but the characters are uncompelling and the dialog is not great.', {'neg': 0.327, 'neu': 0.579, 'pos': 0.094, 'compound': -0.7042}),
+    ("Today only kinda sux! But I'll get by, lol", {'neg': 0.127, 'neu': 0.556, 'pos': 0.317, 'compound': 0.5249}),
+    ('Sentiment analysis has never been this good!', {'neg': 0.0, 'neu': 0.621, 'pos': 0.379, 'compound': 0.5672}),
+    ('With VADER, sentiment analysis is the shit!', {'neg': 0.0, 'neu': 0.583, 'pos': 0.417, 'compound': 0.6476}),
+    ('On the other hand, VADER is quite bad ass', {'neg': 0.0, 'neu': 0.423, 'pos': 0.577, 'compound': 0.802}),
+    ('Without a doubt, excellent idea.', {'neg': 0.0, 'neu': 0.341, 'pos': 0.659, 'compound': 0.7013}),
+    ('Roger Dodger is one of the least compelling variations on this theme.', {'neg': 0.132, 'neu': 0.868, 'pos': 0.0, 'compound': -0.1695}),
+    ('No problem, no worries, no drama or nor fear', {'neg': 0.0, 'neu': 0.267, 'pos': 0.733, 'compound': 0.8399}),
+    ('BTC to the moon 🚀🌕💎 HODL!!! Never selling, this is the best dip ever', {'neg': 0.0, 'neu': 0.77, 'pos': 0.23, 'compound': 0.7249}),
+    ('Got rekt on that rug pull, absolutely terrible project and the devs are scammers???', {'neg': 0.232, 'neu': 0.768, 'pos': 0.0, 'compound': -0.6037}),
+    ('ETH gas fees are kind of insane but the ecosystem is really great', {'neg': 0.105, 'neu': 0.576, 'pos': 0.319, 'compound': 0.7264}),
+    ('I love this coin so much but honestly the team is a bit shady and I hate the roadmap', {'neg': 0.18, 'neu': 0.571, 'pos': 0.249, 'compound': 0.2372}),
+    (GOLDEN_SELFTEXT, {'neg': 0.156, 'neu': 0.657, 'pos': 0.187, 'compound': 0.9975}),
+]
+
+@pytest.mark.parametrize("text,expected", GOLDEN_SCORES)
+def test_polarity_scores_golden_corpus(text, expected):
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    assert SentimentIntensityAnalyzer().polarity_scores(text) == expected
+
+# 11. Test emoji translation keeps the original spacing rules
+def test_translate_emojis_spacing():
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    analyzer = SentimentIntensityAnalyzer()
+    rocket, moon = analyzer.emojis["🚀"], analyzer.emojis["🌕"]
+    assert analyzer._translate_emojis("plain ascii text!") == "plain ascii text!"
+    assert analyzer._translate_emojis("café ünïcode") == "café ünïcode"
+    assert analyzer._translate_emojis("🚀🌕") == rocket + " " + moon
+    assert analyzer._translate_emojis("to the 🚀") == "to the " + rocket
+    assert analyzer._translate_emojis("moon🌕soon") == "moon " + moon + "soon"
+
+# 12. Test batch scoring returns results in input order, in-process and over a forked pool
+def test_polarity_scores_batch_preserves_order(monkeypatch):
+    import vader.vaderSentiment as vs
+
+    analyzer = vs.SentimentIntensityAnalyzer()
+    texts = [text for text, _ in GOLDEN_SCORES[:8]] * 3
+    expected = [analyzer.polarity_scores(text) for text in texts]
+
+    assert analyzer.polarity_scores_batch(texts) == expected
+    monkeypatch.setattr(vs, "POOL_MIN_BATCH", 1)
+    assert analyzer.polarity_scores_batch(texts, workers=2, chunksize=5) == expected
+    assert analyzer.polarity_scores_batch([], workers=2) == []
+
+# 13. Test the vectorized engine gives the same compound scores as polarity_scores
+def test_vectorized_compound_parity():
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+    from vader.vectorized import VectorizedSentimentAnalyzer
+
+    analyzer = SentimentIntensityAnalyzer()
+    texts = [text for text, _ in GOLDEN_SCORES] + [
+        "", "   ", "but", "NO good", "no no no", "kind of good", "the shit", "GOOD good",
+        "least good", "very least good", "it is not the bomb but I'm kind of happy",
+    ]
+    expected = [analyzer.polarity_scores(text)["compound"] for text in texts]
+    assert VectorizedSentimentAnalyzer(analyzer).compound_scores(texts) == expected
+    assert VectorizedSentimentAnalyzer(analyzer).compound_scores([]) == []
+
+# 14. Test the opt-in score cache counts hits/misses/evictions and drops entries on lexicon reload
+def test_polarity_scores_cache():
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    analyzer = SentimentIntensityAnalyzer(cache_size=2)
+    first = analyzer.polarity_scores("HODL to the moon!")
+    first["compound"] = 42
+    assert analyzer.polarity_scores("HODL to the moon!") != first
+    analyzer.polarity_scores("rekt again")
+    analyzer.polarity_scores("rug pull")
+    stats = analyzer.cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 3, 1, 2)
+
+    analyzer.reload_lexicons()
+    analyzer.polarity_scores("rug pull")
+    stats = analyzer.cache.stats()
+    assert (stats["misses"], stats["invalidations"], stats["size"]) == (4, 1, 1)
+    assert SentimentIntensityAnalyzer().cache is None
+
+# 15. Test the memory-mapped lexicon store scores like the dict-backed analyzer
+def test_memory_mapped_lexicon_store():
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    mapped = SentimentIntensityAnalyzer(memory_mapped=True)
+    plain = SentimentIntensityAnalyzer(use_snapshot=False)
+    assert len(mapped.lexicon) == len(plain.lexicon)
+    assert mapped.lexicon["good"] == plain.lexicon["good"]
+    assert "hodlllll" not in mapped.lexicon and mapped.lexicon.get(None) is None
+    assert mapped.emojis["💘"] == plain.emojis["💘"]
+    for text, expected in GOLDEN_SCORES:
+        assert mapped.polarity_scores(text) == expected
+    assert not hasattr(plain, "lexicon_full_filepath")
+
+# 16. Test compound_score matches polarity_scores and backs the sentence view
+def test_compound_score_matches_polarity_scores():
+    import views
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    analyzer = SentimentIntensityAnalyzer(cache_size=4)
+    texts = [text for text, _ in GOLDEN_SCORES] + ["", "no"]
+    expected = [SentimentIntensityAnalyzer().polarity_scores(text)["compound"] for text in texts]
+    assert [analyzer.compound_score(text) for text in texts] == expected
+    assert analyzer.compound_scores_batch(texts) == expected
+    assert views.get_sentence_sentiments(texts) == [views.analyzer.polarity_scores(text)["compound"] for text in texts]
+
+# 17. Test the slang overlay hot-reloads only changed words and invalidates cached scores
+def test_overlay_lexicon_hot_reload(tmp_path):
+    import os
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    overlay = tmp_path / "overlay.txt"
+    overlay.write_text("hodl\t1.5\ngood\t3.0\n", encoding="utf-8")
+    analyzer = SentimentIntensityAnalyzer(cache_size=8, overlay_file=str(overlay))
+    base_good = SentimentIntensityAnalyzer().lexicon["good"]
+    assert analyzer.lexicon["hodl"] == 1.5 and analyzer.lexicon["good"] == 3.0
+    before = analyzer.polarity_scores("hodl")["compound"]
+
+    overlay.write_text("hodl\t-1.5\n", encoding="utf-8")
+    os.utime(overlay, ns=(0, 0))
+    assert analyzer.reload_overlay() == 2
+    assert analyzer.lexicon["hodl"] == -1.5 and analyzer.lexicon["good"] == base_good
+    assert analyzer.polarity_scores("hodl")["compound"] == -before
+    assert analyzer.reload_overlay() == 0
+
+    # a malformed overlay at startup falls back to the base lexicon instead of failing every request
+    broken = tmp_path / "broken.txt"
+    broken.write_text("hodl\tnot-a-number\n", encoding="utf-8")
+    fallback = SentimentIntensityAnalyzer(overlay_file=str(broken))
+    assert fallback.lexicon["good"] == base_good and "hodl" not in fallback.lexicon
+    assert fallback.polarity_scores("good")["compound"] > 0
+    broken.write_text("hodl\t1.5\n", encoding="utf-8")
+    assert fallback.reload_overlay() == 1 and fallback.lexicon["hodl"] == 1.5
+
+# 18. Test the admin reload endpoint
+@patch('app.reload_overlay')
+def test_admin_reload_lexicon(mock_reload_overlay, client, monkeypatch):
+    mock_reload_overlay.return_value = {"changed": 3, "lexicon_version": 1}
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post('/admin/reload-lexicon').status_code == 404
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+
+    assert client.post('/admin/reload-lexicon').status_code == 403
+    assert client.post('/admin/reload-lexicon', headers={"X-Admin-Token": "wrong"}).status_code == 403
+    mock_reload_overlay.assert_not_called()
+    response = client.post('/admin/reload-lexicon', headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "success", "changed": 3, "lexicon_version": 1}
+
+# 19. Test the phrase automaton reports every idiom and multi-word booster by token position
+def test_phrase_matcher_positions():
+    from vader.phrases import PhraseMatcher
+    from vader.vaderSentiment import PHRASE_MATCHER, SentimentIntensityAnalyzer
+
+    matcher = PhraseMatcher(["to the moon", "the moon", "moon", "rug pull"])
+    assert len(matcher) == 3
+    tokens = "ride it to the moon then rug pull".split()
+    assert matcher.matches(tokens) == {(2, 5): "to the moon", (3, 5): "the moon", (6, 8): "rug pull"}
+
+    tokens = "this coin is kind of the bomb and a real kiss of death".split()
+    assert PHRASE_MATCHER.matches(tokens) == {(3, 5): "kind of", (5, 7): "the bomb", (10, 13): "kiss of death"}
+    analyzer = SentimentIntensityAnalyzer()
+    assert analyzer._sentiment_laden_idioms_check(0.0, "we are in the red again".split()) == -2
+    assert analyzer._sentiment_laden_idioms_check(0.0, "reddit is in the reddish zone".split()) == 0.0
+
+# 20. Test streaming a long document chunk by chunk matches scoring it whole
+def test_streaming_para_sentiment(monkeypatch):
+    import views
+    from vader.streaming import StreamingScorer, iter_sentences, split_sentences
+
+    text = GOLDEN_SELFTEXT + " Then it crashed.  Badly!"
+    chunks = [text[i:i + 37] for i in range(0, len(text), 37)]
+    sentences = split_sentences(text)
+    assert list(iter_sentences(chunks)) == sentences
+    run_on = "no sentence end in sight "
+    assert list(iter_sentences([run_on] * 10, max_sentence_chars=60)) == [(run_on * 3).strip()] * 3 + [run_on.strip()]
+
+    scorer = StreamingScorer(views.analyzer)
+    scored = sum(len(scorer.feed(chunk)) for chunk in chunks)
+    assert scored == len(sentences) - 1
+    scorer.close()
+    expected = sum(views.analyzer.compound_score(s) for s in sentences) / len(sentences)
+    assert scorer.average == round(expected, 4)
+
+    monkeypatch.setattr('nltk.tokenize.sent_tokenize', split_sentences)
+    monkeypatch.setattr(views, 'ensure_sentence_tokenizer', lambda: None)
+    monkeypatch.setattr(views, 'STREAM_PARA_CHARS', 100)
+    assert views.get_para_sentiment(text) == views.stream_para_sentiment(iter(chunks)) == round(expected, 4)
+
+# 21. Test the benchmark suite runs on every corpus and flags slowdowns beyond the tolerance
+def test_benchmark_regression_check():
+    import benchmark
+
+    results = benchmark.run(size=20, repeat=1)
+    assert set(results["corpora"]) == {"tweets", "selftext", "emoji_heavy", "caps_rants"}
+    for stats in results["corpora"].values():
+        assert stats["texts_per_sec"] > 0
+        assert set(stats["per_text_us"]) == {"polarity_scores", "compound_score", "translate_emojis",
+                                             "SentiText", "but_check"}
+
+    baseline = {"corpora": {"tweets": {"calibration_us": 100.0,
+                                       "per_text_us": {"polarity_scores": 10.0, "SentiText": 2.0}}}}
+    current = {"corpora": {"tweets": {"calibration_us": 200.0,
+                                      "per_text_us": {"polarity_scores": 30.0, "SentiText": 4.5}}}}
+    # the host is twice as slow, so only polarity_scores (30 > 20 * 1.3) regressed
+    assert benchmark.compare(current, baseline, tolerance=0.3) == [("tweets", "polarity_scores", 20.0, 30.0)]
+    assert benchmark.compare(current, baseline, tolerance=0.6) == []
+
+# 22. Test paragraphs are scored as one flat sentence batch, with empty paragraphs scoring 0.0
+def test_get_para_sentiments_flat_batch(monkeypatch):
+    import views
+    from vader.cache import ScoreCache
+    from vader.streaming import split_sentences
+
+    monkeypatch.setattr('nltk.tokenize.sent_tokenize', split_sentences)
+    monkeypatch.setattr(views, 'ensure_sentence_tokenizer', lambda: None)
+    monkeypatch.setattr(views, 'para_cache', ScoreCache(16))
+    batches = []
+    score_batch = views.analyzer.compound_scores_batch
+    monkeypatch.setattr(views.analyzer, 'compound_scores_batch',
+                        lambda sentences, workers=None: batches.append(sentences) or score_batch(sentences))
+
+    paragraphs = ["BTC is great! Fees are awful.", "", "   ", "Solid project. Good team. Nice roadmap.",
+                  "BTC is great! Fees are awful."]
+    scores = views.get_para_sentiments(paragraphs)
+    assert len(batches) == 1 and len(batches[0]) == 7
+    assert scores[1] == scores[2] == 0.0
+    assert scores[0] == scores[4]
+    for paragraph, score in zip(paragraphs, scores):
+        sentences = split_sentences(paragraph)
+        if sentences:
+            expected = sum(views.analyzer.compound_score(s) for s in sentences) / len(sentences)
+            assert score == round(expected, 4)
+
+    assert views.get_para_sentiments(paragraphs) == scores
+    assert len(batches) == 1
+    assert views.get_para_sentiments([]) == []
+
+# 23. Test large batches run on the warm worker pool in order, and the workers follow lexicon reloads without a re-fork
+def test_scoring_pool_preserves_order(monkeypatch, tmp_path):
+    import views
+    from vader import pool as vader_pool
+    from vader.streaming import split_sentences
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("150000 100000\n")
+    monkeypatch.setattr(vader_pool, "CGROUP_V2_CPU_MAX", str(cpu_max))
+    assert vader_pool.cgroup_cpu_limit() == 1.5
+    assert vader_pool.available_cpus() == 1
+    cpu_max.write_text("max 100000\n")
+    assert vader_pool.cgroup_cpu_limit() is None
+
+    import os
+
+    overlay = tmp_path / "overlay.txt"
+    overlay.write_text("hodl\t1.5\n", encoding="utf-8")
+    analyzer = SentimentIntensityAnalyzer(overlay_file=str(overlay))
+    scoring_pool = vader_pool.ScoringPool(analyzer, workers=2, min_batch=4)
+    monkeypatch.setattr(views, 'analyzer', analyzer)
+    monkeypatch.setattr(views, 'pool', scoring_pool)
+    monkeypatch.setattr(views, 'POOL_MIN_PARAGRAPHS', 4)
+    monkeypatch.setattr(views, 'ensure_sentence_tokenizer', lambda: None)
+    monkeypatch.setattr('nltk.tokenize.sent_tokenize', split_sentences)
+    try:
+        # never forked lazily from a request: until started, batches stay in-process
+        assert not scoring_pool.active_for(1000)
+        scoring_pool.start()
+        workers = scoring_pool._pool
+
+        sentences = [text for text, _ in GOLDEN_SCORES] * 3 + ["hodl"] * 4
+        expected = [analyzer.compound_score(text) for text in sentences]
+        assert views.get_sentence_sentiments(sentences) == expected
+
+        paragraphs = [" ".join(sentences[i:i + 3]) for i in range(0, len(sentences), 3)]
+        expected_paras = views.score_paragraphs(paragraphs)
+        assert views.get_para_sentiments(paragraphs) == expected_paras
+
+        overlay.write_text("hodl\t-1.5\n", encoding="utf-8")
+        os.utime(overlay, ns=(0, 0))
+        assert views.reload_overlay()["changed"] == 1
+        expected = [analyzer.compound_score(text) for text in sentences]
+        assert expected[-1] < 0
+        assert views.get_sentence_sentiments(sentences) == expected
+        assert scoring_pool.reloads == 1 and scoring_pool._pool is workers
+    finally:
+        scoring_pool.close()
+
+# 24. Test the NDJSON streaming endpoints answer one line per record, errors included
+@patch('app.get_para_sentiment')
+@patch('app.get_sentence_sentiment')
+def test_ndjson_streaming_endpoints(mock_get_sentence_sentiment, mock_get_para_sentiment, client):
+    import json
+    mock_get_sentence_sentiment.side_effect = lambda text: len(text) / 10
+    mock_get_para_sentiment.return_value = 0.25
+
+    body = '"good"\n\n{"id": "t3", "text": "bad day"}\nnot json\n{"id": 7}\n'
+    response = client.post('/sentence-sentiment-analyze/stream', data=body)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0] == {"index": 0, "score": 0.4}
+    assert lines[1] == {"index": 1, "id": "t3", "score": 0.7}
+    assert lines[2]["index"] == 2 and "error" in lines[2]
+    assert lines[3]["id"] == 7 and "error" in lines[3]
+
+    response = client.post('/para-sentiment-analyze/stream', data='"one. two."\n"three."')
+    assert [json.loads(line)["score"] for line in response.get_data(as_text=True).splitlines()] == [0.25, 0.25]
+
+# 25. Test inputs are bucketed by token length under the batch size and token budget, in input order
+def test_predict_scores_length_buckets():
+    from predictor import length_buckets, predict_scores
+
+    lengths = [50, 3, 400, 4, 5, 60, 3]
+    assert length_buckets(lengths, batch_size=3, token_budget=200) == [[1, 6, 3], [4, 0, 5], [2]]
+    assert length_buckets([], batch_size=3, token_budget=200) == []
+
+    texts = ["x" * n for n in lengths]
+    calls = []
+    def pad(batch, **kwargs):
+        calls.append([len(ids) for ids in batch["input_ids"]])
+        return {k: MagicMock() for k in batch}
+
+    tokenizer = MagicMock(side_effect=lambda texts, **kwargs: {"input_ids": [[1] * len(t) for t in texts],
+                                                               "attention_mask": [[1] * len(t) for t in texts]})
+    tokenizer.pad.side_effect = pad
+    # each row "predicts" its own token length, so the scores show whether order was restored
+    model = MagicMock(side_effect=lambda **inputs: MagicMock(logits=MagicMock(lengths=calls[-1])))
+    with patch('predictor.torch') as mock_torch:
+        mock_torch.argmax.side_effect = lambda logits, dim: [MagicMock(item=MagicMock(return_value=n))
+                                                              for n in logits.lengths]
+        scores, stats = predict_scores(texts, tokenizer, model, "cpu", batch_size=3, token_budget=200)
+
+    assert calls == [[3, 3, 4], [5, 50, 60], [400]]
+    assert scores == [round(((n + 1) - 3) / 2, 3) for n in lengths]
+    assert stats["batches"] == 3
+    assert stats["padding_ratio"] == round(1 - sum(lengths) / (3 * 4 + 3 * 60 + 400), 4)
+
+# 26. Test concurrent requests are coalesced into shared batches and each gets its own slice back
+def test_dynamic_batcher_coalesces_requests():
+    import threading
+    from batcher import DynamicBatcher
+
+    calls = []
+    def run_batch(items):
+        calls.append(list(items))
+        if "boom" in items:
+            raise RuntimeError("model failed")
+        return [item.upper() for item in items], {"batches": 1, "padding_ratio": 0.0}
+
+    batcher = DynamicBatcher(run_batch, max_batch_size=6, max_delay=0.2)
+    results = {}
+    def call(name, items):
+        results[name] = batcher.submit(items)
+
+    threads = [threading.Thread(target=call, args=(i, ["a%d" % i, "b%d" % i])) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i in range(4):
+        assert results[i][0] == ["A%d" % i, "B%d" % i]
+    assert sorted(len(call_items) for call_items in calls) == [2, 6]
+    assert batcher.requests == 4 and batcher.batches == 2
+    assert batcher.submit([]) == ([], {"batches": 0, "padding_ratio": 0.0, "requests": 0})
+    with pytest.raises(RuntimeError):
+        batcher.submit(["boom"])
+    assert batcher.submit(["ok"])[0] == ["OK"]
+
+# 27. Test the inference backend is picked from config
+def test_load_model_backends(monkeypatch):
+    import backends
+
+    tokenizer, model, device = backends.load_model("torch")
+    model.eval.assert_called()
+
+    quantized = MagicMock()
+    monkeypatch.setattr(backends.torch.quantization, "quantize_dynamic", MagicMock(return_value=quantized))
+    monkeypatch.setenv("BERT_BACKEND", "int8")
+    tokenizer, model, device = backends.load_model()
+    assert model is quantized
+    backends.torch.quantization.quantize_dynamic.assert_called_once()
+
+    with pytest.raises(ValueError):
+        backends.load_model("tensorrt")
+
+# 28. Test liveness/readiness and that predictions answer 503 while BERT is still loading
+def test_model_loader_and_readiness(client, monkeypatch):
+    import threading
+    import app as app_module
+    import backends
+
+    assert client.get('/healthz').get_json() == {"status": "alive"}
+
+    release = threading.Event()
+    def slow_load(backend=None):
+        release.wait(5)
+        return MagicMock(), MagicMock(), "cpu"
+    monkeypatch.setattr(backends, "load_model", slow_load)
+    monkeypatch.setattr(backends, "predict_scores", MagicMock())
+    loader = backends.ModelLoader()
+    monkeypatch.setattr(app_module, "bert", loader)
+    monkeypatch.setattr(app_module, "BERT_WAIT_SECONDS", 0.01)
+
+    assert loader.state == "not_loaded"
+    response = client.post('/predict_sentiment', json=["Moon soon"])
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert client.get('/readyz').status_code == 200
+    assert client.get('/readyz?model=bert').status_code == 503
+
+    release.set()
+    loader.get(timeout=5)
+    body = client.get('/readyz?model=bert').get_json()
+    assert body["status"] == "ready" and body["bert"]["state"] == "ready"
+    assert body["bert"]["load_seconds"] is not None and body["bert"]["warmup_seconds"] is not None
+
+    failing = backends.ModelLoader()
+    monkeypatch.setattr(backends, "load_model", MagicMock(side_effect=OSError("no weights")))
+    with pytest.raises(backends.ModelNotReady):
+        failing.get(timeout=5)
+    assert failing.status()["error"] == "no weights"
+
+# 29. Test duplicate and previously seen texts skip the model, with the cache persisted to disk
+def test_prediction_cache_dedupes(client, monkeypatch, tmp_path):
+    import app as app_module
+    from prediction_cache import PredictionCache
+
+    # predictions made with another truncation length are not reused
+    assert app_module.prediction_cache.version.endswith(":{0}".format(app_module.MAX_LENGTH))
+    cache = PredictionCache(100, str(tmp_path / "predictions.db"), version="torch:test")
+    submitted = []
+    def submit(texts):
+        submitted.append(list(texts))
+        return [0.5] * len(texts), {"batches": 1 if texts else 0, "padding_ratio": 0.0, "requests": 1}
+    monkeypatch.setattr(app_module, "prediction_cache", cache)
+    monkeypatch.setattr(app_module, "bert", MagicMock())
+    monkeypatch.setattr(app_module.batcher, "submit", submit)
+
+    texts = ["BTC hits $70k", "btc  hits $70K", "ETH flat", "BTC hits $70k"]
+    response = client.post('/predict_sentiment', json=texts)
+    assert response.get_json() == [0.5, 0.5, 0.5, 0.5]
+    assert submitted == [["BTC hits $70k", "ETH flat"]]
+    assert response.headers["X-Unique-Texts"] == "2" and response.headers["X-Cache-Hits"] == "0"
+
+    response = client.post('/predict_sentiment', json=["eth FLAT", "SOL up"])
+    assert submitted[-1] == ["SOL up"]
+    assert response.headers["X-Cache-Hits"] == "1"
+    cache.close()
+
+    reopened = PredictionCache(100, str(tmp_path / "predictions.db"), version="torch:test")
+    assert reopened.get_many([PredictionCache.key("sol up")]) == {PredictionCache.key("SOL up"): 0.5}
+    assert reopened.stats()["disk_hits"] == 1
+    assert PredictionCache(100, str(tmp_path / "predictions.db"), version="onnx:test").get_many(
+        [PredictionCache.key("sol up")]) == {}
+
+    # the disk layer is bounded too: past max_rows the least recently used predictions go
+    import sqlite3
+    bounded = PredictionCache(1, str(tmp_path / "bounded.db"), version="torch:test", max_rows=2)
+    bounded.put_many([(PredictionCache.key("a"), 0.1)])
+    bounded.put_many([(PredictionCache.key("b"), 0.2)])
+    bounded.memory.clear()
+    assert bounded.get_many([PredictionCache.key("a")]) == {PredictionCache.key("a"): 0.1}
+    bounded.put_many([(PredictionCache.key("c"), 0.3)])
+    bounded.memory.clear()
+    assert bounded.get_many([PredictionCache.key(t) for t in "abc"]) == {
+        PredictionCache.key("a"): 0.1, PredictionCache.key("c"): 0.3}
+    assert bounded.stats()["disk_evictions"] == 1
+    bounded.close()
+
+    legacy = sqlite3.connect(str(tmp_path / "legacy.db"))
+    legacy.execute("CREATE TABLE predictions (key BLOB PRIMARY KEY, version TEXT NOT NULL, score REAL NOT NULL)")
+    legacy.execute("INSERT INTO predictions VALUES (?, 'torch:test', 0.5)", (PredictionCache.key("old"),))
+    legacy.commit()
+    legacy.close()
+    upgraded = PredictionCache(10, str(tmp_path / "legacy.db"), version="torch:test", max_rows=10)
+    assert upgraded.get_many([PredictionCache.key("old")]) == {PredictionCache.key("old"): 0.5}
+    upgraded.close()
+
+# 30. Test the bulk scorer streams the news dump and resumes an interrupted run without duplicates
+def test_bulk_score_resumes(tmp_path):
+    import csv
+    import io
+    import json
+    import os
+    from bulk_score import iter_json_array, score_file
+
+    records = [{"id": i, "title": 'Title, "number" %d' % i, "url": "x"} for i in range(25)]
+    assert list(iter_json_array(io.StringIO(json.dumps(records, indent=1)), read_size=7)) == records
+    assert list(iter_json_array(io.StringIO(" [ 1, 22 ,{\"a\": [3]}]"), read_size=3)) == [1, 22, {"a": [3]}]
+    assert list(iter_json_array(io.StringIO("[]"))) == []
+
+    input_path = tmp_path / "news.json"
+    input_path.write_text(json.dumps(records), encoding="utf-8")
+    output_path = str(tmp_path / "scores.csv")
+
+    calls = []
+    def flaky(titles):
+        calls.append(len(titles))
+        if len(calls) == 3:
+            raise RuntimeError("interrupted")
+        return [float(t.split()[-1]) / 100 for t in titles]
+
+    with pytest.raises(RuntimeError):
+        score_file(str(input_path), output_path, flaky, chunk_size=10)
+    assert score_file(str(input_path), output_path, flaky, chunk_size=10) == 5
+    assert calls == [10, 10, 5, 5]
+
+    with open(output_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row["id"]) for row in rows] == list(range(25))
+    assert rows[7]["title"] == records[7]["title"] and float(rows[7]["score"]) == 0.07
+    assert score_file(str(input_path), output_path, flaky, chunk_size=10) == 0
+
+    # a CSV that no longer matches its checkpoint is neither padded nor silently overwritten
+    os.remove(output_path)
+    with pytest.raises(ValueError, match="shorter"):
+        score_file(str(input_path), output_path, flaky, chunk_size=10)
+    assert not os.path.exists(output_path)
+    os.remove(output_path + ".checkpoint")
+    with open(output_path, "w") as f:
+        f.write("id,title,score\n1,kept,0.5\n")
+    with pytest.raises(ValueError, match="no checkpoint"):
+        score_file(str(input_path), output_path, flaky, chunk_size=10)
+    assert open(output_path).read().endswith("kept,0.5\n")
+    assert score_file(str(input_path), output_path, flaky, chunk_size=10, restart=True) == 25
+
+    short_path = tmp_path / "short.json"
+    short_path.write_text(json.dumps(records[:5]), encoding="utf-8")
+    with pytest.raises(ValueError, match="only 5 records"):
+        score_file(str(short_path), output_path, flaky, chunk_size=10)
+
+# 31. Test the cascade keeps clear VADER scores and routes only the ambiguous band to BERT
+def test_cascade_routes_ambiguous_to_bert(client, monkeypatch):
+    import app as app_module
+    from cascade import CascadeScorer
+
+    compounds = {"Moon soon": 0.8, "Rug pull": -0.7, "ETH flat": 0.1, "Hmm": 0.0}
+    bert_calls = []
+    def bert_scores(texts):
+        bert_calls.append(list(texts))
+        return [-0.5] * len(texts)
+    cascade = CascadeScorer(lambda texts: [compounds[t] for t in texts], bert_scores, band=0.3)
+    monkeypatch.setattr(app_module, "cascade", cascade)
+    monkeypatch.setattr(app_module, "bert", MagicMock())
+
+    response = client.post('/cascade-sentiment-analyze', json=list(compounds))
+    assert response.status_code == 200
+    assert response.get_json() == [{"score": 0.8, "model": "vader"}, {"score": -0.7, "model": "vader"},
+                                   {"score": -0.5, "model": "bert"}, {"score": -0.5, "model": "bert"}]
+    assert bert_calls == [["ETH flat", "Hmm"]]
+    assert response.headers["X-Routed-To-Bert"] == "2"
+
+    response = client.post('/cascade-sentiment-analyze?band=0.05', json=["ETH flat", "Hmm"])
+    assert [r["model"] for r in response.get_json()] == ["vader", "bert"]
+    assert client.get('/cascade-sentiment-analyze/stats').get_json() == {
+        "band": 0.3, "texts": 6, "routed_to_bert": 3, "bert_fraction": 0.5}
+
+    app_module.bert.get.side_effect = app_module.ModelNotReady("Model is still loading")
+    response = client.post('/cascade-sentiment-analyze', json=["Hmm"])
+    assert response.get_json() == [{"score": 0.0, "model": "vader"}]
+    assert response.headers["X-Bert-Available"] == "false"
+    assert client.post('/cascade-sentiment-analyze', json="Hmm").status_code == 400
+
+# 32. Test /metrics exposes route latency, batch and text counts and the service stats in Prometheus format
+def test_metrics_endpoint(client, monkeypatch):
+    import app as app_module
+    from metrics import Registry
+
+    registry = Registry()
+    histogram = registry.histogram("demo_seconds", "Demo", ["route"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    counter = registry.counter("demo_total", "Demo")
+    counter.inc(amount=3)
+    text = registry.render()
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text and "demo_total 3" in text
+
+    monkeypatch.setattr(app_module, "get_para_sentiments", MagicMock(return_value=[0.5, -0.5]))
+    assert client.post('/para-sentiment-analyze', json=["Moon soon", "Rug pull"]).status_code == 200
+    monkeypatch.setattr(app_module, "bert", MagicMock())
+    monkeypatch.setattr(app_module, "predict_scores", MagicMock(return_value=([0.5, 0.5], {
+        "batches": 1, "padding_ratio": 0.0, "tokens": 12, "tokenize_seconds": 0.001, "pad_seconds": 0.0,
+        "forward_seconds": 0.02})))
+    assert app_module.run_bert_batch(["BTC up", "ETH up"])[0] == [0.5, 0.5]
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.get_data(as_text=True)
+    assert 'sentiment_request_duration_seconds_count{route="/para-sentiment-analyze",method="POST",status="200"}' in body
+    assert 'sentiment_request_texts_bucket{route="/para-sentiment-analyze",le="2"}' in body
+    assert 'sentiment_texts_scored_total{model="vader"}' in body
+    assert "bert_batch_texts_count" in body and 'bert_stage_duration_seconds_count{stage="forward"}' in body
+    assert "# TYPE cascade_bert_fraction gauge" in body and "bert_batcher_batches_total" in body
+
+# 33. Test bulk jobs are scored in the background, paged, and resumed after a restart
+def test_scoring_jobs(client, monkeypatch, tmp_path):
+    import io
+    import time
+    import app as app_module
+    from jobs import JobManager
+
+    calls = []
+    def vader(texts):
+        calls.append(len(texts))
+        return [float(len(text)) for text in texts]
+    manager = JobManager(str(tmp_path / "jobs.db"), {"vader": vader}, batch_size=2)
+    monkeypatch.setattr(app_module, "jobs", manager)
+
+    response = client.post('/jobs', json=["a", "bb", "ccc", "dddd", "eeeee"])
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    for _ in range(100):
+        status = client.get('/jobs/' + job_id).get_json()
+        if status["state"] == "done":
+            break
+        time.sleep(0.01)
+    assert status["done"] == 5 and status["progress"] == 1.0
+    assert calls == [2, 2, 1]
+
+    page = client.get('/jobs/{0}/results?offset=1&limit=3'.format(job_id)).get_json()
+    assert [r["score"] for r in page["results"]] == [2.0, 3.0, 4.0] and page["next_offset"] == 4
+    assert client.get('/jobs/{0}/results?offset=4'.format(job_id)).get_json()["next_offset"] is None
+    assert client.get('/jobs/nope').status_code == 404
+    assert client.post('/jobs?scorer=gpt', json=["a"]).status_code == 400
+
+    upload = {"file": (io.BytesIO(b'[{"id": 1, "title": "BTC up"}, "ETH down"]'), "news.json")}
+    response = client.post('/jobs', data=upload, content_type="multipart/form-data")
+    assert response.status_code == 202
+    upload_id = response.get_json()["job_id"]
+    assert manager.status(upload_id)["total"] == 2
+    for _ in range(100):
+        if manager.status(upload_id)["state"] == "done":
+            break
+        time.sleep(0.01)
+    manager.close()
+
+    # a job interrupted mid-way is picked up from its first unscored text by the next process
+    stopped = JobManager(str(tmp_path / "resume.db"), {"vader": vader}, batch_size=2)
+    stopped.start()
+    stopped._queue.put = lambda job_id: None
+    job_id = stopped.submit(["a", "bb", "ccc"], "vader")
+    with stopped._db_lock, stopped._db:
+        stopped._db.execute("UPDATE job_items SET score = 9.0 WHERE job_id = ? AND idx = 0", (job_id,))
+        stopped._db.execute("UPDATE jobs SET state = 'running', done = 1 WHERE id = ?", (job_id,))
+    stopped.close()
+
+    del calls[:]
+    restarted = JobManager(str(tmp_path / "resume.db"), {"vader": vader}, batch_size=2)
+    restarted.start()
+    for _ in range(100):
+        if restarted.status(job_id)["state"] == "done":
+            break
+        time.sleep(0.01)
+    assert calls == [2]
+    assert [r["score"] for r in restarted.results(job_id)[1]] == [9.0, 2.0, 3.0]
+    restarted.close()
+
+# 34. Test the ONNX wrapper runs through the predictor and fills the segment ids an older export expects
+def test_onnx_backend_through_predictor(monkeypatch):
+    from types import SimpleNamespace
+    import numpy as np
+    import backends
+    from predictor import predict_scores
+
+    class FakeTensor(object):
+        def __init__(self, rows):
+            self.array = np.array(rows, dtype=np.int64)
+        def to(self, device):
+            return self
+        def cpu(self):
+            return self
+        def numpy(self):
+            return self.array
+
+    feeds = []
+    class FakeSession(object):
+        def __init__(self, path, options, providers):
+            pass
+        def get_inputs(self):
+            return [SimpleNamespace(name=n) for n in ("input_ids", "attention_mask", "token_type_ids")]
+        def run(self, outputs, feed):
+            # ONNX Runtime rejects a feed that lacks a graph input
+            assert set(feed) == {"input_ids", "attention_mask", "token_type_ids"}
+            feeds.append(feed)
+            return [np.zeros((len(feed["input_ids"]), 5), dtype=np.float32)]
+    onnxruntime = MagicMock(InferenceSession=FakeSession)
+    monkeypatch.setitem(sys.modules, "onnxruntime", onnxruntime)
+
+    model = backends.OnnxSentimentModel("bert.onnx")
+    tokenizer = MagicMock()
+    tokenizer.return_value = {"input_ids": [[101, 5, 102], [101, 7, 8, 102]],
+                              "attention_mask": [[1, 1, 1], [1, 1, 1, 1]]}
+    def pad(encoded, padding, return_tensors):
+        width = max(len(ids) for ids in encoded["input_ids"])
+        return dict((name, FakeTensor([row + [0] * (width - len(row)) for row in rows]))
+                    for name, rows in encoded.items())
+    tokenizer.pad.side_effect = pad
+
+    scores, stats = predict_scores(["BTC up", "ETH down a lot"], tokenizer, model, "cpu", batch_size=1)
+    assert len(scores) == 2 and stats["batches"] == 2
+    assert [feed["token_type_ids"].tolist() for feed in feeds] == [[[0, 0, 0]], [[0, 0, 0, 0]]]
+
+# 35. Test cache kinds cannot collide with a text that ends in the kind's name
+def test_score_cache_kinds_do_not_collide():
+    from vader.cache import ScoreCache
+    from vader.vaderSentiment import SentimentIntensityAnalyzer
+
+    assert ScoreCache.key("good", "compound") != ScoreCache.key("goodcompound")
+    assert ScoreCache.key("news", "paragraph") != ScoreCache.key("newsparagraph", "")
+
+    analyzer = SentimentIntensityAnalyzer(cache_size=10)
+    assert isinstance(analyzer.compound_score("good"), float)
+    assert isinstance(analyzer.polarity_scores("goodcompound"), dict)
+    assert isinstance(analyzer.polarity_scores("badcompound"), dict)
+    assert isinstance(analyzer.compound_score("bad"), float)
+
+# 36. Test paragraph scores match the original sequential sum exactly on a fuzzed corpus
+def test_paragraph_scores_match_sequential_sum(monkeypatch):
+    import random
+    import views
+    from vader.streaming import split_sentences
+
+    monkeypatch.setattr('nltk.tokenize.sent_tokenize', split_sentences)
+    words = ["good", "bad", "great", "awful", "not", "very", "BTC", "moon", "rekt", "love", "hate", "meh",
+             "but", "kind of", "!", ":)", "HODL", "scam", "pump", "dump", "fine", "LOL"]
+    rng = random.Random(13)
+    paragraphs = []
+    for _ in range(2000):
+        sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 8))) + rng.choice(".!?")
+                     for _ in range(rng.randint(1, 9))]
+        paragraphs.append(" ".join(sentences))
+
+    expected = []
+    for paragraph in paragraphs:
+        sentence_list = split_sentences(paragraph)
+        para_sentiment = 0.0
+        for sentence in sentence_list:
+            para_sentiment += views.analyzer.polarity_scores(sentence)["compound"]
+        expected.append(round(para_sentiment / len(sentence_list), 4))
+    assert views.score_paragraphs(paragraphs) == expected
+
+# 37. Test BERT-backed jobs never block on a model that is not ready
+def test_jobs_wait_for_bert_readiness(monkeypatch, tmp_path):
+    import time
+    import app as app_module
+    from cascade import CascadeScorer
+    from jobs import JobManager, RetryLater
+
+    bert = MagicMock()
+    bert.get.side_effect = app_module.ModelNotReady("Model is still loading")
+    bert_scores = MagicMock(return_value=[-0.5])
+    monkeypatch.setattr(app_module, "bert", bert)
+    monkeypatch.setattr(app_module, "BERT_WAIT_SECONDS", 0.01)
+    monkeypatch.setattr(app_module, "cascade", CascadeScorer(lambda texts: [0.0] * len(texts), bert_scores))
+
+    assert app_module.score_cascade_job(["Hmm"]) == [{"score": 0.0, "model": "vader"}]
+    bert_scores.assert_not_called()
+    bert.get.assert_called_with(timeout=0.01)
+    with pytest.raises(RetryLater):
+        app_module.score_bert_job(["Hmm"])
+
+    # a job whose model is not ready goes back to the queue and finishes once it is
+    attempts = []
+    def bert_job(texts):
+        attempts.append(len(texts))
+        if len(attempts) < 3:
+            raise RetryLater("BERT model is not ready")
+        return [0.25] * len(texts)
+    manager = JobManager(str(tmp_path / "jobs.db"), {"bert": bert_job}, retry_delay=0.01)
+    job_id = manager.submit(["BTC flat", "ETH flat"], "bert")
+    for _ in range(200):
+        if manager.status(job_id)["state"] == "done":
+            break
+        time.sleep(0.01)
+    assert attempts == [2, 2, 2]
+    assert [r["score"] for r in manager.results(job_id)[1]] == [0.25, 0.25]
+    manager.close()
+
+# 38. Test paragraph scores computed before a lexicon reload are not cached under the new version
+def test_para_cache_uses_version_scored_with(monkeypatch):
+    import views
+    from vader.cache import ScoreCache
+    from vader.streaming import split_sentences
+
+    monkeypatch.setattr('nltk.tokenize.sent_tokenize', split_sentences)
+    monkeypatch.setattr(views, 'ensure_sentence_tokenizer', lambda: None)
+    cache = ScoreCache(16)
+    monkeypatch.setattr(views, 'para_cache', cache)
+    score_paragraphs = views.score_paragraphs
+    def reload_while_scoring(paragraphs):
+        scores = score_paragraphs(paragraphs)
+        # an overlay reload lands on another thread while this request is scoring
+        views.analyzer.lexicon_version += 1
+        return scores
+    monkeypatch.setattr(views, 'score_paragraphs', reload_while_scoring)
+
+    version = views.analyzer.lexicon_version
+    try:
+        views.get_para_sentiments(["Moon soon. Great team."])
+        key = ScoreCache.key("Moon soon. Great team.", "paragraph")
+        assert cache.get(key, version + 1) is None
+    finally:
+        views.analyzer.lexicon_version = version
+
+# 39. Test VADER_MEMORY_MAPPED makes the service analyzer serve the lexicon from the mapped snapshot
+def test_views_memory_mapped_flag():
+    import os
+    import subprocess
+
+    script = ("import views; from vader.lexicon_store import MappedTable; "
+              "base = getattr(views.analyzer.lexicon, 'maps', [views.analyzer.lexicon])[-1]; "
+              "print(views.analyzer.memory_mapped, isinstance(base, MappedTable), views.analyzer.lexicon['good'])")
+    env = dict(os.environ, VADER_MEMORY_MAPPED="1", VADER_WORKERS="1")
+    output = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.split()
+    assert output == ["True", "True", "1.9"]
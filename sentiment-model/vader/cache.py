@@ -0,0 +1,90 @@
+# coding: utf-8
+"""
+Size-bounded LRU cache for sentiment scores.
+
+Entries are keyed by a 128-bit BLAKE2 digest of the text rather than the
+text itself, so a cache of long Reddit posts does not pin their contents in
+memory. Every lookup carries the lexicon version it was computed against;
+when the version moves on, the whole cache is dropped before it is used.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ScoreCache(object):
+    """
+    Thread-safe LRU mapping of text digests to scores, with hit/miss/eviction counters.
+    """
+
+    def __init__(self, maxsize=10000):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(text, kind=""):
+        """
+        Cache key for `text`; `kind` keeps different score types of the same text apart.
+        The kind is the BLAKE2 personalization (at most 16 bytes), not part of the
+        hashed bytes, so no text can collide with another text plus a kind.
+        """
+        return hashlib.blake2b(str(text).encode("utf-8", "surrogatepass"), digest_size=16,
+                               person=kind.encode("utf-8")).digest()
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def get(self, key, version=0):
+        """
+        Return the cached value for `key`, or None on a miss
+        """
+        with self._lock:
+            self._check_version(version)
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=0):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries),
+                    "maxsize": self.maxsize,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "invalidations": self.invalidations,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
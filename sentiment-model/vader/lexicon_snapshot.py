@@ -0,0 +1,296 @@
+# coding: utf-8
+"""
+Precompiled binary snapshot of the VADER lexicon and emoji lexicon.
+
+Parsing ``vader_lexicon.txt`` and ``emoji_utf8_lexicon.txt`` line by line on
+every worker start is avoidable: the snapshot stores both tables as packed
+sections (newline separated keys plus a native float64 array for valences)
+that load with a handful of C-level calls. Each snapshot records the size and
+mtime of the source files it was compiled from, so editing a ``.txt`` file
+makes the snapshot stale and it is recompiled on the next load.
+
+Keys are stored sorted, with a uint32 offset table and an open-addressing
+hash index, so the snapshot can also be memory-mapped and queried in place
+(see `vader.lexicon_store`) instead of being unpacked into dicts.
+
+Build it at image build time with::
+
+    python -m vader.lexicon_snapshot
+"""
+import os
+import sys
+import json
+import codecs
+import zlib
+import struct
+from array import array
+
+MAGIC = b"VADERSNP"
+FORMAT_VERSION = 2
+SNAPSHOT_SUFFIX = ".snapshot"
+
+_HEADER = struct.Struct("<8sII")
+_ALIGN = 8
+
+
+def parse_lexicon(text):
+    """
+    Convert the contents of a lexicon file to a {word: valence} dictionary
+    """
+    lex_dict = {}
+    for line in text.rstrip('\n').split('\n'):
+        if not line:
+            continue
+        (word, measure) = line.strip().split('\t')[0:2]
+        lex_dict[word] = float(measure)
+    return lex_dict
+
+
+def parse_emoji_lexicon(text):
+    """
+    Convert the contents of an emoji lexicon file to a {emoji: description} dictionary
+    """
+    emoji_dict = {}
+    for line in text.rstrip('\n').split('\n'):
+        (emoji, description) = line.strip().split('\t')[0:2]
+        emoji_dict[emoji] = description
+    return emoji_dict
+
+
+def snapshot_path_for(lexicon_path):
+    """
+    Default location of the snapshot compiled from ``lexicon_path``
+    """
+    return os.path.splitext(lexicon_path)[0] + SNAPSHOT_SUFFIX
+
+
+def source_fingerprint(path):
+    """
+    Cheap identity of a source file: absolute path, size and mtime
+    """
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def _read_text(path):
+    with codecs.open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _pad(buf):
+    buf.extend(b"\0" * (-len(buf) % _ALIGN))
+
+
+def _pack_sections(sections):
+    """
+    Lay out named byte sections back to back, 8-byte aligned, returning the
+    packed body and a {name: [offset, length]} table relative to the body start
+    """
+    body = bytearray()
+    table = {}
+    for name, data in sections:
+        _pad(body)
+        table[name] = [len(body), len(data)]
+        body.extend(data)
+    return body, table
+
+
+def hash_key(raw):
+    """
+    Hash of a UTF-8 encoded key, as used by the snapshot's hash index
+    """
+    return zlib.crc32(raw)
+
+
+def _string_table(strings):
+    """
+    Newline separated UTF-8 blob plus uint32 start offsets; string i is
+    ``blob[offsets[i]:offsets[i + 1] - 1]``
+    """
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = array("I", [0])
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw) + 1)
+    return b"\n".join(encoded), offsets, encoded
+
+
+def _hash_index(encoded):
+    """
+    Open-addressing (linear probing) table of 1-based key indices, at most
+    half full so that lookups of missing keys stop early
+    """
+    size = 1
+    while size < 2 * len(encoded):
+        size *= 2
+    mask = size - 1
+    slots = array("I", bytes(4 * size))
+    for idx, raw in enumerate(encoded):
+        slot = hash_key(raw) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = idx + 1
+    return slots
+
+
+def write_snapshot(snapshot_path, lexicon, emojis, sources):
+    """
+    Atomically write ``lexicon`` and ``emojis`` to ``snapshot_path``
+    """
+    words = sorted(lexicon)
+    word_blob, word_offsets, word_raw = _string_table(words)
+    emoji_keys = sorted(emojis)
+    emoji_blob, emoji_offsets, emoji_raw = _string_table(emoji_keys)
+    description_blob, description_offsets, _ = _string_table(emojis[e] for e in emoji_keys)
+    sections = [
+        ("lexicon_keys", word_blob),
+        ("lexicon_key_offsets", word_offsets.tobytes()),
+        ("lexicon_values", array("d", (lexicon[w] for w in words)).tobytes()),
+        ("lexicon_index", _hash_index(word_raw).tobytes()),
+        ("emoji_keys", emoji_blob),
+        ("emoji_key_offsets", emoji_offsets.tobytes()),
+        ("emoji_values", description_blob),
+        ("emoji_value_offsets", description_offsets.tobytes()),
+        ("emoji_index", _hash_index(emoji_raw).tobytes()),
+    ]
+    body, table = _pack_sections(sections)
+    meta = json.dumps({"byteorder": sys.byteorder,
+                       "sources": sources,
+                       "counts": {"lexicon": len(lexicon), "emojis": len(emojis)},
+                       "sections": table}).encode("utf-8")
+    head = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)))
+    head.extend(meta)
+    _pad(head)
+    # section offsets are relative to the (aligned) end of the header
+    tmp_path = "{0}.{1}.tmp".format(snapshot_path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(head)
+        f.write(body)
+    os.replace(tmp_path, snapshot_path)
+
+
+def read_meta(buf):
+    """
+    Return (meta, body_offset) for a snapshot buffer, or (None, 0) if the
+    buffer is not a snapshot this version of the code understands
+    """
+    if len(buf) < _HEADER.size:
+        return None, 0
+    magic, version, meta_len = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None, 0
+    end = _HEADER.size + meta_len
+    meta = json.loads(bytes(buf[_HEADER.size:end]).decode("utf-8"))
+    if meta.get("byteorder") != sys.byteorder:
+        return None, 0
+    return meta, end + (-end % _ALIGN)
+
+
+def section(buf, meta, body_offset, name):
+    offset, length = meta["sections"][name]
+    start = body_offset + offset
+    return buf[start:start + length]
+
+
+def _split(blob, count):
+    if not count:
+        return []
+    return bytes(blob).decode("utf-8").split("\n")
+
+
+def snapshot_is_fresh(snapshot_path, sources):
+    """
+    True if ``snapshot_path`` is a readable snapshot compiled from ``sources``
+    """
+    try:
+        with open(snapshot_path, "rb") as f:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                return False
+            magic, version, meta_len = _HEADER.unpack(head)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                return False
+            head += f.read(meta_len)
+    except OSError:
+        return False
+    meta, _ = read_meta(head)
+    return meta is not None and meta["sources"] == sources
+
+
+def compile_sources(lexicon_path, emoji_path):
+    """
+    Parse both source files, returning (lexicon, emojis, sources fingerprint)
+    """
+    sources = {"lexicon": source_fingerprint(lexicon_path),
+               "emoji": source_fingerprint(emoji_path)}
+    lexicon = parse_lexicon(_read_text(lexicon_path))
+    emojis = parse_emoji_lexicon(_read_text(emoji_path))
+    return lexicon, emojis, sources
+
+
+def load_snapshot(snapshot_path, sources):
+    """
+    Load (lexicon, emojis) from ``snapshot_path`` if it exists and was
+    compiled from ``sources``; otherwise return None
+    """
+    try:
+        with open(snapshot_path, "rb") as f:
+            buf = f.read()
+    except OSError:
+        return None
+    meta, body_offset = read_meta(buf)
+    if meta is None or meta["sources"] != sources:
+        return None
+    counts = meta["counts"]
+    values = array("d")
+    values.frombytes(section(buf, meta, body_offset, "lexicon_values"))
+    lexicon = dict(zip(_split(section(buf, meta, body_offset, "lexicon_keys"), counts["lexicon"]), values))
+    emojis = dict(zip(_split(section(buf, meta, body_offset, "emoji_keys"), counts["emojis"]),
+                      _split(section(buf, meta, body_offset, "emoji_values"), counts["emojis"])))
+    return lexicon, emojis
+
+
+def load_lexicons(lexicon_path, emoji_path, snapshot_path=None, write=True):
+    """
+    Return (lexicon, emojis) for the given source files, preferring a fresh
+    snapshot and (re)compiling it from the ``.txt`` sources when it is missing
+    or stale. A read-only install simply falls back to parsing the sources.
+    """
+    if snapshot_path is None:
+        snapshot_path = snapshot_path_for(lexicon_path)
+    sources = {"lexicon": source_fingerprint(lexicon_path),
+               "emoji": source_fingerprint(emoji_path)}
+    loaded = load_snapshot(snapshot_path, sources)
+    if loaded is not None:
+        return loaded
+
+    lexicon, emojis, sources = compile_sources(lexicon_path, emoji_path)
+    if write:
+        try:
+            write_snapshot(snapshot_path, lexicon, emojis, sources)
+        except OSError:
+            pass
+    return lexicon, emojis
+
+
+def default_paths(lexicon_file="vader_lexicon.txt", emoji_lexicon="emoji_utf8_lexicon.txt"):
+    """
+    Resolve lexicon file names relative to the ``vader`` package directory
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(here, lexicon_file), os.path.join(here, emoji_lexicon)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile the VADER lexicons into a binary snapshot.")
+    parser.add_argument("--lexicon", default="vader_lexicon.txt")
+    parser.add_argument("--emoji-lexicon", default="emoji_utf8_lexicon.txt")
+    parser.add_argument("--output", default=None, help="snapshot path (default: next to the lexicon)")
+    args = parser.parse_args()
+
+    lexicon_path, emoji_path = default_paths(args.lexicon, args.emoji_lexicon)
+    out = args.output or snapshot_path_for(lexicon_path)
+    lex, emo, sources = compile_sources(lexicon_path, emoji_path)
+    write_snapshot(out, lex, emo, sources)
+    print("Wrote {0} ({1} words, {2} emojis)".format(out, len(lex), len(emo)))
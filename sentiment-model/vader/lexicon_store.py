@@ -0,0 +1,111 @@
+# coding: utf-8
+"""
+Read-only, memory-mapped views of a compiled lexicon snapshot.
+
+`MappedTable` answers lookups straight from the snapshot file through its
+hash index, without unpacking the lexicon into Python dicts. The pages
+belong to the OS page cache, so every worker process that maps the same
+snapshot (forked or not) shares one copy of the lexicon.
+"""
+import mmap
+from collections.abc import Mapping
+
+from .lexicon_snapshot import (compile_sources, hash_key, read_meta, section, snapshot_is_fresh,
+                               snapshot_path_for, source_fingerprint, write_snapshot)
+
+
+class MappedTable(Mapping):
+    """
+    Mapping view over one string table of a snapshot. Values are floats
+    (`values` is a float64 section) or strings (`values` is a string table).
+    """
+
+    def __init__(self, keys, key_offsets, index, values, value_offsets=None):
+        self._keys = keys
+        self._key_offsets = key_offsets.cast("I")
+        self._index = index.cast("I")
+        self._mask = len(self._index) - 1
+        if value_offsets is None:
+            self._values = values.cast("d")
+            self._value_offsets = None
+        else:
+            self._values = values
+            self._value_offsets = value_offsets.cast("I")
+
+    def _find(self, key):
+        try:
+            raw = key.encode("utf-8")
+        except (AttributeError, UnicodeEncodeError):
+            return -1
+        keys, offsets, index, mask = self._keys, self._key_offsets, self._index, self._mask
+        slot = hash_key(raw) & mask
+        while True:
+            idx = index[slot]
+            if not idx:
+                return -1
+            idx -= 1
+            if keys[offsets[idx]:offsets[idx + 1] - 1] == raw:
+                return idx
+            slot = (slot + 1) & mask
+
+    def _value(self, idx):
+        if self._value_offsets is None:
+            return self._values[idx]
+        offsets = self._value_offsets
+        return str(self._values[offsets[idx]:offsets[idx + 1] - 1], "utf-8")
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __getitem__(self, key):
+        idx = self._find(key)
+        if idx < 0:
+            raise KeyError(key)
+        return self._value(idx)
+
+    def get(self, key, default=None):
+        idx = self._find(key)
+        return default if idx < 0 else self._value(idx)
+
+    def __len__(self):
+        return len(self._key_offsets) - 1
+
+    def __iter__(self):
+        keys, offsets = self._keys, self._key_offsets
+        for idx in range(len(self)):
+            yield str(keys[offsets[idx]:offsets[idx + 1] - 1], "utf-8")
+
+
+def open_mapped_lexicons(lexicon_path, emoji_path, snapshot_path=None):
+    """
+    Return (lexicon, emojis) as `MappedTable` views of the snapshot compiled
+    from the given sources, compiling it first if it is missing or stale. If
+    the snapshot cannot be written (read-only install) the freshly parsed
+    dicts are returned instead.
+    """
+    if snapshot_path is None:
+        snapshot_path = snapshot_path_for(lexicon_path)
+    sources = {"lexicon": source_fingerprint(lexicon_path),
+               "emoji": source_fingerprint(emoji_path)}
+    if not snapshot_is_fresh(snapshot_path, sources):
+        lexicon, emojis, sources = compile_sources(lexicon_path, emoji_path)
+        try:
+            write_snapshot(snapshot_path, lexicon, emojis, sources)
+        except OSError:
+            return lexicon, emojis
+
+    with open(snapshot_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buf = memoryview(mapped)
+    meta, body_offset = read_meta(buf)
+    if meta is None:
+        raise ValueError("{0} is not a lexicon snapshot".format(snapshot_path))
+
+    def part(name):
+        return section(buf, meta, body_offset, name)
+
+    lexicon = MappedTable(part("lexicon_keys"), part("lexicon_key_offsets"), part("lexicon_index"),
+                          part("lexicon_values"))
+    emojis = MappedTable(part("emoji_keys"), part("emoji_key_offsets"), part("emoji_index"),
+                         part("emoji_values"), part("emoji_value_offsets"))
+    return lexicon, emojis
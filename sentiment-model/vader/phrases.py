@@ -0,0 +1,90 @@
+# coding: utf-8
+"""
+Token-level Aho-Corasick matching of multi-word VADER phrases.
+
+The idiom and booster rules used to format every 2- and 3-gram around each
+lexicon hit into a string and probe the phrase dictionaries with it. A
+`PhraseMatcher` instead compiles all multi-word phrases into one automaton
+whose transitions are whole (lowercase) tokens, finds every occurrence in a
+single left-to-right pass over a text, and reports them by token position.
+The pass costs one dict lookup per token however many phrases are loaded,
+so growing the idiom tables does not slow scoring down.
+"""
+
+
+class PhraseMatcher(object):
+    """
+    Multi-pattern matcher over token sequences. Phrases are space separated
+    strings; single-word phrases are ignored since a token lookup covers them.
+    """
+
+    def __init__(self, phrases=()):
+        self._phrases = set()
+        self._goto = None
+        self._fail = None
+        self._out = None
+        for phrase in phrases:
+            self.add(phrase)
+
+    def add(self, phrase):
+        """
+        Add `phrase`; the automaton is rebuilt on the next match
+        """
+        words = tuple(phrase.split(" "))
+        if len(words) > 1 and words not in self._phrases:
+            self._phrases.add(words)
+            self._goto = None
+
+    def __len__(self):
+        return len(self._phrases)
+
+    def _build(self):
+        goto = [{}]
+        out = [[]]
+        for words in sorted(self._phrases):
+            state = 0
+            for word in words:
+                nxt = goto[state].get(word)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][word] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((len(words), " ".join(words)))
+
+        # breadth-first failure links; each state also reports the phrases of its suffix states
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for word, nxt in goto[state].items():
+                queue.append(nxt)
+                back = fail[state]
+                while back and word not in goto[back]:
+                    back = fail[back]
+                fail[nxt] = goto[back].get(word, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def finditer(self, tokens):
+        """
+        Yield (start, stop, phrase) for every occurrence of a phrase in
+        `tokens`, overlapping ones included, ordered by `stop`
+        """
+        if self._goto is None:
+            self._build()
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        state = 0
+        for stop, token in enumerate(tokens, 1):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0) if state else root.get(token, 0)
+            for length, phrase in out[state]:
+                yield stop - length, stop, phrase
+
+    def matches(self, tokens):
+        """
+        {(start, stop): phrase} for every phrase occurrence in `tokens`
+        """
+        return dict(((start, stop), phrase) for start, stop, phrase in self.finditer(tokens))
@@ -0,0 +1,169 @@
+# coding: utf-8
+"""
+Warm, pre-forked process pool for scoring large batches.
+
+`SentimentIntensityAnalyzer.polarity_scores_batch` forks a fresh pool per
+call, which is fine for offline jobs but costs a fork (and a cold start of
+every child) per request in the service. `ScoringPool` forks its workers
+once, after the analyzer has loaded its lexicons, and keeps them for the
+life of the process. `start` must run before the process starts any thread
+(model loaders, batchers, job workers): a child forked while another thread
+holds a lock can deadlock on it, so the pool never forks lazily from a
+request. Workers hold a copy-on-write snapshot of the analyzer; every chunk
+carries the parent's `lexicon_version`, and a worker that sees a newer one
+reloads its lexicons from disk (e.g. after an overlay reload) instead of
+the pool being re-forked.
+
+By default the pool is sized to the CPUs the container may actually use:
+the cgroup CPU quota if one is set, otherwise the CPUs the process may run on.
+"""
+import os
+import math
+import threading
+import functools
+import multiprocessing
+
+from . import vaderSentiment
+from .vaderSentiment import POOL_MIN_BATCH, _set_pool_analyzer
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CFS_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CFS_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read_first_line(path):
+    with open(path) as f:
+        return f.readline().strip()
+
+
+def cgroup_cpu_limit():
+    """
+    CPUs allowed by the cgroup CPU quota (v2 ``cpu.max`` or v1 CFS quota),
+    possibly fractional, or None when there is no quota
+    """
+    try:
+        quota, period = _read_first_line(CGROUP_V2_CPU_MAX).split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(_read_first_line(CGROUP_V1_CFS_QUOTA))
+        period = int(_read_first_line(CGROUP_V1_CFS_PERIOD))
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+# parent lexicon_version the forked analyzer of this worker matches
+_worker_version = None
+
+
+def _init_worker(analyzer):
+    global _worker_version
+    _set_pool_analyzer(analyzer)
+    _worker_version = analyzer.lexicon_version
+
+
+def _run_chunk(version, func, chunk):
+    global _worker_version
+    if version != _worker_version:
+        try:
+            vaderSentiment._pool_analyzer.reload_lexicons()
+            _worker_version = version
+        except ValueError:
+            # half-written overlay file: keep the current lexicon and retry on the next chunk
+            pass
+    return [func(item) for item in chunk]
+
+
+def available_cpus():
+    """
+    Number of worker processes the container can keep busy: the usable CPUs,
+    capped by the cgroup quota (rounded down, at least 1)
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, int(math.floor(limit))))
+    return max(1, cpus)
+
+
+class ScoringPool(object):
+    """
+    Long-lived fork pool bound to one analyzer. Functions passed to `map`
+    must be importable module-level callables; in the workers they see the
+    forked copy of the module state, the analyzer included. Until `start`
+    has run, batches are scored in-process.
+    """
+
+    def __init__(self, analyzer, workers=None, min_batch=POOL_MIN_BATCH):
+        self.analyzer = analyzer
+        self.workers = workers if workers else available_cpus()
+        self.min_batch = min_batch
+        self.reloads = 0
+        self._pool = None
+        self._version = None
+        self._lock = threading.Lock()
+        try:
+            self._context = multiprocessing.get_context("fork")
+        except ValueError:
+            self._context = None
+
+    @property
+    def enabled(self):
+        return self.workers > 1 and self._context is not None
+
+    @property
+    def started(self):
+        return self._pool is not None
+
+    def active_for(self, count):
+        """
+        True if a batch of `count` items should be spread over the pool
+        """
+        return self.started and count >= self.min_batch
+
+    def start(self):
+        """
+        Fork the workers; call before any other thread is started
+        """
+        with self._lock:
+            if self.enabled and self._pool is None:
+                # load everything before forking so the children share those pages
+                self.analyzer.lexicon
+                self.analyzer._emoji_charset()
+                self._version = self.analyzer.lexicon_version
+                self._pool = self._context.Pool(self.workers, initializer=_init_worker, initargs=(self.analyzer,))
+
+    def map(self, func, items, chunksize=None):
+        """
+        `func` applied to every item on the pool, in input order
+        """
+        items = list(items)
+        if not items:
+            return []
+        if chunksize is None:
+            chunksize = max(1, len(items) // (self.workers * 4))
+        version = self.analyzer.lexicon_version
+        with self._lock:
+            if version != self._version:
+                # the workers catch up on their next chunk
+                self._version = version
+                self.reloads += 1
+        chunks = [items[start:start + chunksize] for start in range(0, len(items), chunksize)]
+        results = self._pool.map(functools.partial(_run_chunk, version, func), chunks, 1)
+        return [result for chunk in results for result in chunk]
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
@@ -0,0 +1,141 @@
+# coding: utf-8
+"""
+Incremental sentence scoring for documents that arrive (or are read) in chunks.
+
+`iter_sentences` finds sentence boundaries on the fly: each chunk is appended
+to a small buffer, every sentence that the splitter reports before the last
+one is complete and is yielded, and only the trailing, possibly unfinished
+sentence is kept. Memory therefore depends on sentence length rather than
+document length; `max_sentence_chars` caps the buffer for text that never
+ends a sentence (logs, tables, run-on posts).
+
+`StreamingScorer` scores those sentences as they complete and keeps a
+running compound average, which equals the paragraph score computed from
+the fully tokenized text whenever the splitter agrees on the boundaries.
+"""
+import re
+
+from .vaderSentiment import SentimentIntensityAnalyzer
+
+# used when no splitter is given: a sentence ends at ., ! or ? followed by whitespace
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+MAX_SENTENCE_CHARS = 20000
+
+
+def split_sentences(text):
+    """
+    Minimal sentence splitter; returns substrings of `text`
+    """
+    return [sentence for sentence in SENTENCE_END_RE.split(text.strip()) if sentence]
+
+
+class SentenceBuffer(object):
+    """
+    Accumulates text chunks and hands out sentences once they are complete.
+    `split` maps text to its list of sentences, e.g. `nltk.tokenize.sent_tokenize`;
+    it should return substrings of its input.
+    """
+
+    def __init__(self, split=None, max_sentence_chars=MAX_SENTENCE_CHARS):
+        self.split = split if split is not None else split_sentences
+        self.max_sentence_chars = max_sentence_chars
+        self._buffer = ""
+
+    def push(self, chunk):
+        """
+        Add a chunk; return the sentences it completed
+        """
+        if not chunk:
+            return []
+        buffer = self._buffer + chunk
+        sentences = self.split(buffer)
+        if not sentences:
+            # whitespace only so far
+            self._buffer = ""
+            return []
+        # the last sentence may continue in the next chunk; keep its raw text,
+        # trailing whitespace included, so the next chunk joins it correctly
+        last = sentences.pop()
+        start = buffer.rfind(last)
+        self._buffer = buffer[start:] if start >= 0 else last + (" " if buffer[-1].isspace() else "")
+        if len(self._buffer) > self.max_sentence_chars:
+            sentences.append(self._buffer.strip())
+            self._buffer = ""
+        return sentences
+
+    def flush(self):
+        """
+        Return the sentences left in the buffer and empty it
+        """
+        buffer, self._buffer = self._buffer, ""
+        return self.split(buffer) if buffer and not buffer.isspace() else []
+
+
+def iter_sentences(chunks, split=None, max_sentence_chars=MAX_SENTENCE_CHARS):
+    """
+    Yield the sentences of the text made of `chunks` (an iterable of strings)
+    as soon as they are complete
+    """
+    buffer = SentenceBuffer(split, max_sentence_chars)
+    for chunk in chunks:
+        for sentence in buffer.push(chunk):
+            yield sentence
+    for sentence in buffer.flush():
+        yield sentence
+
+
+class StreamingScorer(object):
+    """
+    Push-style scorer: `feed` text chunks as they arrive, read `average` at any
+    time, and `close` once the text is complete to score the last sentence.
+    """
+
+    def __init__(self, analyzer=None, split=None, max_sentence_chars=MAX_SENTENCE_CHARS):
+        self.analyzer = analyzer if analyzer is not None else SentimentIntensityAnalyzer()
+        self._buffer = SentenceBuffer(split, max_sentence_chars)
+        self._closed = False
+        self.count = 0
+        self.total = 0.0
+
+    def score(self, sentence):
+        """
+        Score one complete sentence and add it to the running average
+        """
+        score = self.analyzer.compound_score(sentence)
+        self.count += 1
+        self.total += score
+        return score
+
+    def feed(self, chunk):
+        """
+        Add a chunk of text; return the compound scores of the sentences it completed
+        """
+        if self._closed:
+            raise ValueError("feed() called on a closed StreamingScorer")
+        return [self.score(sentence) for sentence in self._buffer.push(chunk)]
+
+    def close(self):
+        """
+        Score whatever is left in the buffer; return the scores of those sentences
+        """
+        if self._closed:
+            return []
+        self._closed = True
+        return [self.score(sentence) for sentence in self._buffer.flush()]
+
+    @property
+    def average(self):
+        """
+        Mean compound score of the sentences scored so far (0.0 before the first one)
+        """
+        return round(self.total / self.count, 4) if self.count else 0.0
+
+
+def stream_compound_scores(chunks, analyzer=None, split=None, max_sentence_chars=MAX_SENTENCE_CHARS):
+    """
+    Generator over (sentence, compound score, running average) for the text made of `chunks`
+    """
+    scorer = StreamingScorer(analyzer)
+    for sentence in iter_sentences(chunks, split, max_sentence_chars):
+        score = scorer.score(sentence)
+        yield sentence, score, scorer.average
@@ -16,11 +16,22 @@ import math
 import string
 import codecs
 import json
+import time
+import logging
+import threading
+import multiprocessing
+from collections import ChainMap
+from functools import partial
 from itertools import product
 from inspect import getsourcefile
 from io import open
-import nltk
-nltk.download('punkt_tab')
+
+from .cache import ScoreCache
+from .lexicon_snapshot import load_lexicons, parse_lexicon, parse_emoji_lexicon
+from .lexicon_store import open_mapped_lexicons
+from .phrases import PhraseMatcher
+
+logger = logging.getLogger(__name__)
 
 # ##Constants##
 
@@ -42,6 +53,14 @@ NEGATE = \
      "oughtn't", "shan't", "shouldn't", "uh-uh", "wasn't", "weren't",
      "without", "wont", "wouldnt", "won't", "wouldn't", "rarely", "seldom", "despite"]
 
+NEGATE_SET = frozenset(NEGATE)
+
+# batches smaller than this are scored in-process: forking a pool costs more than it saves
+POOL_MIN_BATCH = 1000
+
+# runs of ASCII are skipped by the regex engine when translating emojis
+NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+
 # booster/dampener 'intensifiers' or 'degree adverbs'
 # http://en.wiktionary.org/wiki/Category:English_degree_adverbs
 
@@ -81,6 +100,9 @@ SPECIAL_CASES = {"the shit": 3, "the bomb": 3, "bad ass": 1.5, "badass": 1.5, "b
                  "yeah right": -2, "kiss of death": -1.5, "to die for": 3,
                  "beating heart": 3.1, "broken heart": -2.9 }
 
+# one automaton over every multi-word phrase the rules look for; add new idioms here as well
+PHRASE_MATCHER = PhraseMatcher(list(SPECIAL_CASES) + list(BOOSTER_DICT) + list(SENTIMENT_LADEN_IDIOMS))
+
 
 # #Static methods# #
 
@@ -105,6 +127,13 @@ def negated(input_words, include_nt=True):
     return False
 
 
+def is_negation(word_lower, include_nt=True):
+    """
+    Single-word form of `negated` for a token that is already lowercase
+    """
+    return word_lower in NEGATE_SET or (include_nt and "n't" in word_lower)
+
+
 def normalize(score, alpha=15):
     """
     Normalize the score to be between -1 and 1 using an alpha that
@@ -156,6 +185,21 @@ def scalar_inc_dec(word, valence, is_cap_diff):
     return scalar
 
 
+# analyzer inherited by forked batch workers (see SentimentIntensityAnalyzer.polarity_scores_batch)
+_pool_analyzer = None
+
+
+def _set_pool_analyzer(analyzer):
+    global _pool_analyzer
+    # the cache lock may have been held by another thread at fork time
+    analyzer.cache = None
+    _pool_analyzer = analyzer
+
+
+def _pool_call(method_name, text):
+    return getattr(_pool_analyzer, method_name)(text)
+
+
 class SentiText(object):
     """
     Identify sentiment-relevant string-level properties of input text.
@@ -168,7 +212,19 @@ class SentiText(object):
         self.words_and_emoticons = self._words_and_emoticons()
         # doesn't separate words from\
         # adjacent punctuation (keeps emoticons & contractions)
+        self.words_and_emoticons_lower = [w.lower() for w in self.words_and_emoticons]
+        # lowercased once here so the scoring rules never re-lowercase a token
         self.is_cap_diff = allcap_differential(self.words_and_emoticons)
+        self._phrase_matches = None
+
+    @property
+    def phrase_matches(self):
+        """
+        {(start, stop): phrase} for the multi-word idioms and boosters in the text
+        """
+        if self._phrase_matches is None:
+            self._phrase_matches = PHRASE_MATCHER.matches(self.words_and_emoticons_lower)
+        return self._phrase_matches
 
     @staticmethod
     def _strip_punc_if_word(token):
@@ -198,39 +254,213 @@ class SentimentIntensityAnalyzer(object):
     Give a sentiment intensity score to sentences.
     """
 
-    def __init__(self, lexicon_file="vader_lexicon.txt", emoji_lexicon="emoji_utf8_lexicon.txt"):
+    def __init__(self, lexicon_file="vader_lexicon.txt", emoji_lexicon="emoji_utf8_lexicon.txt",
+                 use_snapshot=True, cache_size=0, memory_mapped=False, overlay_file=None,
+                 overlay_check_interval=5.0):
         _this_module_file_path_ = os.path.abspath(getsourcefile(lambda: 0))
-        lexicon_full_filepath = os.path.join(os.path.dirname(_this_module_file_path_), lexicon_file)
-        with codecs.open(lexicon_full_filepath, encoding='utf-8') as f:
-            self.lexicon_full_filepath = f.read()
-        self.lexicon = self.make_lex_dict()
+        self.lexicon_path = os.path.join(os.path.dirname(_this_module_file_path_), lexicon_file)
+        self.emoji_path = os.path.join(os.path.dirname(_this_module_file_path_), emoji_lexicon)
+        # small lexicon (e.g. crypto_lexicon.txt) merged over the base lexicon, hot-reloadable
+        self.overlay_path = None
+        if overlay_file:
+            self.overlay_path = os.path.join(os.path.dirname(_this_module_file_path_), overlay_file)
+        self.overlay_check_interval = overlay_check_interval
+        self._overlay = {}
+        self._overlay_stat = None
+        self._overlay_checked_at = 0.0
+        self._shadowed = {}
+        self._reload_lock = threading.Lock()
+        self.use_snapshot = use_snapshot
+        # serve lookups from the memory-mapped snapshot instead of per-process dicts
+        self.memory_mapped = memory_mapped
+        # both lexicons are loaded on first use (see `_load_lexicons`)
+        self._lexicon = None
+        self._emojis = None
+        self._emoji_chars = None
+        # bumped whenever the lexicons are reloaded; cached scores of older versions are dropped
+        self.lexicon_version = 0
+        # opt-in LRU cache of polarity_scores results
+        self.cache = ScoreCache(cache_size) if cache_size else None
+
+    @property
+    def lexicon(self):
+        if self._lexicon is None:
+            self._load_lexicons()
+        return self._lexicon
+
+    @property
+    def emojis(self):
+        if self._emojis is None:
+            self._load_lexicons()
+        return self._emojis
+
+    def _load_lexicons(self):
+        """
+        Load the word and emoji lexicons, from the precompiled snapshot when it
+        is fresh, otherwise by parsing the source files
+        """
+        if self.memory_mapped:
+            lexicon, emojis = open_mapped_lexicons(self.lexicon_path, self.emoji_path)
+        elif self.use_snapshot:
+            lexicon, emojis = load_lexicons(self.lexicon_path, self.emoji_path)
+        else:
+            lexicon, emojis = self.make_lex_dict(), self.make_emoji_dict()
+        # a dict base is patched on copy (see `_apply_overlay`), a mapped one is layered under the overlay
+        self._base_lexicon = None if isinstance(lexicon, dict) else lexicon
+        self._overlay = {}
+        self._shadowed = {}
+        self._emojis = emojis
+        overlay = {}
+        if self.overlay_path is not None:
+            try:
+                overlay = self._read_overlay()
+            except ValueError as e:
+                # serve the base lexicon; `check_overlay` retries once the file changes
+                logger.error("Ignoring unreadable lexicon overlay %s: %s", self.overlay_path, e)
+                self._overlay_stat = None
+        if not overlay or not self._apply_overlay(overlay, lexicon):
+            self._lexicon = lexicon
+
+    def reload_lexicons(self):
+        """
+        Reload both lexicons (recompiling a stale snapshot) and invalidate cached scores
+        """
+        with self._reload_lock:
+            self._load_lexicons()
+            self._emoji_chars = None
+            self.lexicon_version += 1
+
+    def _overlay_file_stat(self):
+        try:
+            st = os.stat(self.overlay_path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _read_overlay(self):
+        """
+        Parse the overlay file; a missing file is an empty overlay
+        """
+        stat = self._overlay_file_stat()
+        overlay = {}
+        if stat is not None:
+            with codecs.open(self.overlay_path, encoding='utf-8') as f:
+                overlay = parse_lexicon(f.read())
+        self._overlay_stat = stat
+        return overlay
+
+    def _apply_overlay(self, overlay, current=None):
+        """
+        Swap in a lexicon with `overlay` merged over the base lexicon. Only the
+        words whose overlay valence changed are touched, on a copy, so scoring
+        threads see either the old or the new lexicon and never a mix.
+        Returns the number of changed words.
+        """
+        if current is None:
+            current = self._lexicon
+        previous = self._overlay
+        changed = [w for w in previous.keys() | overlay.keys() if previous.get(w) != overlay.get(w)]
+        if not changed:
+            return 0
+        if self._base_lexicon is not None:
+            # read-only mapped base: layer the overlay on top instead of copying
+            self._overlay = overlay
+            self._lexicon = ChainMap(overlay, self._base_lexicon) if overlay else self._base_lexicon
+            return len(changed)
+
+        merged = dict(current)
+        shadowed = dict(self._shadowed)
+        for word in changed:
+            if word not in previous:
+                # remember what the base lexicon had, so removing the word restores it
+                shadowed[word] = merged.get(word)
+            if word in overlay:
+                merged[word] = overlay[word]
+                continue
+            original = shadowed.pop(word)
+            if original is None:
+                del merged[word]
+            else:
+                merged[word] = original
+        self._overlay = overlay
+        self._shadowed = shadowed
+        self._lexicon = merged
+        return len(changed)
 
-        emoji_full_filepath = os.path.join(os.path.dirname(_this_module_file_path_), emoji_lexicon)
-        with codecs.open(emoji_full_filepath, encoding='utf-8') as f:
-            self.emoji_full_filepath = f.read()
-        self.emojis = self.make_emoji_dict()
+    def reload_overlay(self, force=False):
+        """
+        Re-read the overlay lexicon if its file changed (or `force`), merging
+        only the changed words; returns the number of words that changed
+        """
+        if self.overlay_path is None:
+            return 0
+        self.lexicon
+        with self._reload_lock:
+            self._overlay_checked_at = time.monotonic()
+            if not force and self._overlay_file_stat() == self._overlay_stat:
+                return 0
+            changed = self._apply_overlay(self._read_overlay())
+            if changed:
+                self.lexicon_version += 1
+            return changed
+
+    def check_overlay(self):
+        """
+        Cheap per-request hook: stat the overlay file at most once every
+        `overlay_check_interval` seconds and reload it when it changed
+        """
+        if self.overlay_path is None or \
+                time.monotonic() - self._overlay_checked_at < self.overlay_check_interval:
+            return 0
+        try:
+            return self.reload_overlay()
+        except ValueError:
+            # half-written overlay file: keep serving the current one and retry on the next check
+            return 0
+
+    def _emoji_charset(self):
+        """
+        The single-character emojis of the emoji lexicon (the only ones a
+        character-level scan can match), built once per loaded lexicon
+        """
+        if self._emoji_chars is None:
+            self._emoji_chars = frozenset(e for e in self.emojis if len(e) == 1)
+        return self._emoji_chars
+
+    def _translate_emojis(self, text):
+        """
+        Replace emojis with their textual descriptions. A description is
+        preceded by a space unless it starts the text or follows a space.
+        """
+        # every emoji in the lexicon is non-ASCII, and most texts have none at all
+        if text.isascii() or self._emoji_charset().isdisjoint(text):
+            return text
+        emojis = self.emojis
+
+        def describe(match):
+            char = match.group()
+            if char not in emojis:
+                return char
+            start = match.start()
+            if start == 0 or text[start - 1] == ' ':
+                return emojis[char]
+            return ' ' + emojis[char]
+
+        return NON_ASCII_RE.sub(describe, text)
 
     def make_lex_dict(self):
         """
         Convert lexicon file to a dictionary
         """
-        lex_dict = {}
-        for line in self.lexicon_full_filepath.rstrip('\n').split('\n'):
-            if not line:
-                continue
-            (word, measure) = line.strip().split('\t')[0:2]
-            lex_dict[word] = float(measure)
-        return lex_dict
+        with codecs.open(self.lexicon_path, encoding='utf-8') as f:
+            return parse_lexicon(f.read())
 
     def make_emoji_dict(self):
         """
         Convert emoji lexicon file to a dictionary
         """
-        emoji_dict = {}
-        for line in self.emoji_full_filepath.rstrip('\n').split('\n'):
-            (emoji, description) = line.strip().split('\t')[0:2]
-            emoji_dict[emoji] = description
-        return emoji_dict
+        with codecs.open(self.emoji_path, encoding='utf-8') as f:
+            return parse_emoji_lexicon(f.read())
 
     def polarity_scores(self, text):
         """
@@ -238,61 +468,123 @@ class SentimentIntensityAnalyzer(object):
         Positive values are positive valence, negative value are negative
         valence.
         """
+        if self.cache is None:
+            return self._polarity_scores(text)
+        key = ScoreCache.key(text)
+        version = self.lexicon_version
+        cached = self.cache.get(key, version)
+        if cached is None:
+            cached = self._polarity_scores(text)
+            self.cache.put(key, cached, version)
+        # callers may mutate the returned dict
+        return dict(cached)
+
+    def compound_score(self, text):
+        """
+        Return only the compound score of `text`, the same value as
+        `polarity_scores(text)["compound"]` without the pos/neu/neg ratios
+        """
+        if self.cache is None:
+            return self.score_compound(*self._sentiments(text))
+        key = ScoreCache.key(text, "compound")
+        version = self.lexicon_version
+        compound = self.cache.get(key, version)
+        if compound is None:
+            compound = self.score_compound(*self._sentiments(text))
+            self.cache.put(key, compound, version)
+        return compound
+
+    def _polarity_scores(self, text):
+        sentiments, text = self._sentiments(text)
+        return self.score_valence(sentiments, text)
+
+    def _sentiments(self, text):
+        """
+        Per-token valences of `text` after all rules, plus the text they were
+        computed from (emojis translated)
+        """
         # convert emojis to their textual descriptions
-        text_no_emoji = ""
-        prev_space = True
-        for chr in text:
-            if chr in self.emojis:
-                # get the textual description
-                description = self.emojis[chr]
-                if not prev_space:
-                    text_no_emoji += ' '
-                text_no_emoji += description
-                prev_space = False
-            else:
-                text_no_emoji += chr
-                prev_space = chr == ' '
-        text = text_no_emoji.strip()
+        text = self._translate_emojis(text).strip()
 
         sentitext = SentiText(text)
 
         sentiments = []
         words_and_emoticons = sentitext.words_and_emoticons
+        words_lower = sentitext.words_and_emoticons_lower
+        last = len(words_lower) - 1
         for i, item in enumerate(words_and_emoticons):
             valence = 0
+            item_lowercase = words_lower[i]
             # check for vader_lexicon words that may be used as modifiers or negations
-            if item.lower() in BOOSTER_DICT:
+            if item_lowercase in BOOSTER_DICT:
                 sentiments.append(valence)
                 continue
-            if (i < len(words_and_emoticons) - 1 and item.lower() == "kind" and
-                    words_and_emoticons[i + 1].lower() == "of"):
+            if i < last and item_lowercase == "kind" and words_lower[i + 1] == "of":
                 sentiments.append(valence)
                 continue
 
             sentiments = self.sentiment_valence(valence, sentitext, item, i, sentiments)
 
-        sentiments = self._but_check(words_and_emoticons, sentiments)
+        sentiments = self._but_check(words_lower, sentiments)
+
+        return sentiments, text
 
-        valence_dict = self.score_valence(sentiments, text)
+    def polarity_scores_batch(self, texts, workers=None, chunksize=None):
+        """
+        Return `polarity_scores` for every text in `texts`, in input order.
+        Large batches are spread over `workers` forked processes (default: one
+        per CPU) which inherit the already loaded lexicons; batches smaller
+        than POOL_MIN_BATCH, or platforms without fork, are scored in-process.
+        """
+        return self._map_batch("polarity_scores", texts, workers, chunksize)
 
-        return valence_dict
+    def compound_scores_batch(self, texts, workers=None, chunksize=None):
+        """
+        Return `compound_score` for every text in `texts`, in input order
+        (see `polarity_scores_batch` for how the work is spread)
+        """
+        return self._map_batch("compound_score", texts, workers, chunksize)
+
+    def _map_batch(self, method_name, texts, workers, chunksize):
+        texts = list(texts)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(texts))
+        if workers <= 1 or len(texts) < POOL_MIN_BATCH:
+            method = getattr(self, method_name)
+            return [method(text) for text in texts]
+        try:
+            context = multiprocessing.get_context("fork")
+        except ValueError:
+            method = getattr(self, method_name)
+            return [method(text) for text in texts]
+
+        # load everything before forking so the children share those pages
+        self.lexicon
+        self._emoji_charset()
+        if chunksize is None:
+            chunksize = max(1, len(texts) // (workers * 4))
+        with context.Pool(workers, initializer=_set_pool_analyzer, initargs=(self,)) as pool:
+            return pool.map(partial(_pool_call, method_name), texts, chunksize)
 
     def sentiment_valence(self, valence, sentitext, item, i, sentiments):
         is_cap_diff = sentitext.is_cap_diff
         words_and_emoticons = sentitext.words_and_emoticons
-        item_lowercase = item.lower()
-        if item_lowercase in self.lexicon:
+        words_lower = sentitext.words_and_emoticons_lower
+        lexicon = self.lexicon
+        item_lowercase = words_lower[i]
+        if item_lowercase in lexicon:
             # get the sentiment valence 
-            valence = self.lexicon[item_lowercase]
+            valence = lexicon[item_lowercase]
 
             # check for "no" as negation for an adjacent lexicon item vs "no" as its own stand-alone lexicon item
-            if item_lowercase == "no" and i != len(words_and_emoticons)-1 and words_and_emoticons[i + 1].lower() in self.lexicon:
+            if item_lowercase == "no" and i != len(words_lower)-1 and words_lower[i + 1] in lexicon:
                 # don't use valence of "no" as a lexicon item. Instead set it's valence to 0.0 and negate the next item
                 valence = 0.0
-            if (i > 0 and words_and_emoticons[i - 1].lower() == "no") \
-               or (i > 1 and words_and_emoticons[i - 2].lower() == "no") \
-               or (i > 2 and words_and_emoticons[i - 3].lower() == "no" and words_and_emoticons[i - 1].lower() in ["or", "nor"] ):
-                valence = self.lexicon[item_lowercase] * N_SCALAR
+            if (i > 0 and words_lower[i - 1] == "no") \
+               or (i > 1 and words_lower[i - 2] == "no") \
+               or (i > 2 and words_lower[i - 3] == "no" and words_lower[i - 1] in ("or", "nor")):
+                valence = lexicon[item_lowercase] * N_SCALAR
 
             # check if sentiment laden word is in ALL CAPS (while others aren't)
             if item.isupper() and is_cap_diff:
@@ -305,106 +597,92 @@ class SentimentIntensityAnalyzer(object):
                 # dampen the scalar modifier of preceding words and emoticons
                 # (excluding the ones that immediately preceed the item) based
                 # on their distance from the current item.
-                if i > start_i and words_and_emoticons[i - (start_i + 1)].lower() not in self.lexicon:
+                if i > start_i and words_lower[i - (start_i + 1)] not in lexicon:
                     s = scalar_inc_dec(words_and_emoticons[i - (start_i + 1)], valence, is_cap_diff)
                     if start_i == 1 and s != 0:
                         s = s * 0.95
                     if start_i == 2 and s != 0:
                         s = s * 0.9
                     valence = valence + s
-                    valence = self._negation_check(valence, words_and_emoticons, start_i, i)
+                    valence = self._negation_check(valence, words_lower, start_i, i)
                     if start_i == 2:
-                        valence = self._special_idioms_check(valence, words_and_emoticons, i)
+                        valence = self._special_idioms_check(valence, words_lower, i, sentitext.phrase_matches)
 
-            valence = self._least_check(valence, words_and_emoticons, i)
+            valence = self._least_check(valence, words_lower, i)
         sentiments.append(valence)
         return sentiments
 
-    def _least_check(self, valence, words_and_emoticons, i):
+    def _least_check(self, valence, words_and_emoticons_lower, i):
         # check for negation case using "least"
-        if i > 1 and words_and_emoticons[i - 1].lower() not in self.lexicon \
-                and words_and_emoticons[i - 1].lower() == "least":
-            if words_and_emoticons[i - 2].lower() != "at" and words_and_emoticons[i - 2].lower() != "very":
+        # (expects the lowercased tokens, see SentiText.words_and_emoticons_lower)
+        if i > 0 and words_and_emoticons_lower[i - 1] == "least" \
+                and "least" not in self.lexicon:
+            if i == 1 or (words_and_emoticons_lower[i - 2] != "at" and words_and_emoticons_lower[i - 2] != "very"):
                 valence = valence * N_SCALAR
-        elif i > 0 and words_and_emoticons[i - 1].lower() not in self.lexicon \
-                and words_and_emoticons[i - 1].lower() == "least":
-            valence = valence * N_SCALAR
         return valence
 
     @staticmethod
-    def _but_check(words_and_emoticons, sentiments):
+    def _but_check(words_and_emoticons_lower, sentiments):
         # check for modification in sentiment due to contrastive conjunction 'but'
-        words_and_emoticons_lower = [str(w).lower() for w in words_and_emoticons]
+        # (expects the lowercased tokens, see SentiText.words_and_emoticons_lower)
         if 'but' in words_and_emoticons_lower:
             bi = words_and_emoticons_lower.index('but')
-            for sentiment in sentiments:
-                si = sentiments.index(sentiment)
+            for si in range(len(sentiments)):
                 if si < bi:
-                    sentiments.pop(si)
-                    sentiments.insert(si, sentiment * 0.5)
+                    sentiments[si] = sentiments[si] * 0.5
                 elif si > bi:
-                    sentiments.pop(si)
-                    sentiments.insert(si, sentiment * 1.5)
+                    sentiments[si] = sentiments[si] * 1.5
         return sentiments
 
     @staticmethod
-    def _special_idioms_check(valence, words_and_emoticons, i):
-        words_and_emoticons_lower = [str(w).lower() for w in words_and_emoticons]
-        onezero = "{0} {1}".format(words_and_emoticons_lower[i - 1], words_and_emoticons_lower[i])
-
-        twoonezero = "{0} {1} {2}".format(words_and_emoticons_lower[i - 2],
-                                          words_and_emoticons_lower[i - 1], words_and_emoticons_lower[i])
-
-        twoone = "{0} {1}".format(words_and_emoticons_lower[i - 2], words_and_emoticons_lower[i - 1])
-
-        threetwoone = "{0} {1} {2}".format(words_and_emoticons_lower[i - 3],
-                                           words_and_emoticons_lower[i - 2], words_and_emoticons_lower[i - 1])
-
-        threetwo = "{0} {1}".format(words_and_emoticons_lower[i - 3], words_and_emoticons_lower[i - 2])
-
-        sequences = [onezero, twoonezero, twoone, threetwoone, threetwo]
-
-        for seq in sequences:
+    def _special_idioms_check(valence, words_and_emoticons_lower, i, phrase_matches=None):
+        # (expects the lowercased tokens, see SentiText.words_and_emoticons_lower, and
+        # the PHRASE_MATCHER matches for them, see SentiText.phrase_matches)
+        if phrase_matches is None:
+            phrase_matches = PHRASE_MATCHER.matches(words_and_emoticons_lower)
+        if not phrase_matches:
+            return valence
+
+        # (start, stop) token spans of onezero, twoonezero, twoone, threetwoone and threetwo
+        sequences = [(i - 1, i + 1), (i - 2, i + 1), (i - 2, i), (i - 3, i), (i - 3, i - 1)]
+
+        for span in sequences:
+            seq = phrase_matches.get(span)
             if seq in SPECIAL_CASES:
                 valence = SPECIAL_CASES[seq]
                 break
 
-        if len(words_and_emoticons_lower) - 1 > i:
-            zeroone = "{0} {1}".format(words_and_emoticons_lower[i], words_and_emoticons_lower[i + 1])
-            if zeroone in SPECIAL_CASES:
-                valence = SPECIAL_CASES[zeroone]
-        if len(words_and_emoticons_lower) - 1 > i + 1:
-            zeroonetwo = "{0} {1} {2}".format(words_and_emoticons_lower[i], words_and_emoticons_lower[i + 1],
-                                              words_and_emoticons_lower[i + 2])
-            if zeroonetwo in SPECIAL_CASES:
-                valence = SPECIAL_CASES[zeroonetwo]
+        # zeroone, then zeroonetwo
+        for span in [(i, i + 2), (i, i + 3)]:
+            seq = phrase_matches.get(span)
+            if seq in SPECIAL_CASES:
+                valence = SPECIAL_CASES[seq]
 
         # check for booster/dampener bi-grams such as 'sort of' or 'kind of'
-        n_grams = [threetwoone, threetwo, twoone]
-        for n_gram in n_grams:
+        n_grams = [(i - 3, i), (i - 3, i - 1), (i - 2, i)]
+        for span in n_grams:
+            n_gram = phrase_matches.get(span)
             if n_gram in BOOSTER_DICT:
                 valence = valence + BOOSTER_DICT[n_gram]
         return valence
 
     @staticmethod
-    def _sentiment_laden_idioms_check(valence, senti_text_lower):
+    def _sentiment_laden_idioms_check(valence, words_and_emoticons_lower, phrase_matches=None):
         # Future Work
         # check for sentiment laden idioms that don't contain a lexicon word
-        idioms_valences = []
-        for idiom in SENTIMENT_LADEN_IDIOMS:
-            if idiom in senti_text_lower:
-                print(idiom, senti_text_lower)
-                valence = SENTIMENT_LADEN_IDIOMS[idiom]
-                idioms_valences.append(valence)
+        if phrase_matches is None:
+            phrase_matches = PHRASE_MATCHER.matches(words_and_emoticons_lower)
+        idioms = set(phrase for phrase in phrase_matches.values() if phrase in SENTIMENT_LADEN_IDIOMS)
+        idioms_valences = [SENTIMENT_LADEN_IDIOMS[idiom] for idiom in idioms]
         if len(idioms_valences) > 0:
             valence = sum(idioms_valences) / float(len(idioms_valences))
         return valence
 
     @staticmethod
-    def _negation_check(valence, words_and_emoticons, start_i, i):
-        words_and_emoticons_lower = [str(w).lower() for w in words_and_emoticons]
+    def _negation_check(valence, words_and_emoticons_lower, start_i, i):
+        # (expects the lowercased tokens, see SentiText.words_and_emoticons_lower)
         if start_i == 0:
-            if negated([words_and_emoticons_lower[i - (start_i + 1)]]):  # 1 word preceding lexicon word (w/o stopwords)
+            if is_negation(words_and_emoticons_lower[i - (start_i + 1)]):  # 1 word preceding lexicon word (w/o stopwords)
                 valence = valence * N_SCALAR
         if start_i == 1:
             if words_and_emoticons_lower[i - 2] == "never" and \
@@ -414,7 +692,7 @@ class SentimentIntensityAnalyzer(object):
             elif words_and_emoticons_lower[i - 2] == "without" and \
                     words_and_emoticons_lower[i - 1] == "doubt":
                 valence = valence
-            elif negated([words_and_emoticons_lower[i - (start_i + 1)]]):  # 2 words preceding the lexicon word position
+            elif is_negation(words_and_emoticons_lower[i - (start_i + 1)]):  # 2 words preceding the lexicon word position
                 valence = valence * N_SCALAR
         if start_i == 2:
             if words_and_emoticons_lower[i - 3] == "never" and \
@@ -424,7 +702,7 @@ class SentimentIntensityAnalyzer(object):
             elif words_and_emoticons_lower[i - 3] == "without" and \
                     (words_and_emoticons_lower[i - 2] == "doubt" or words_and_emoticons_lower[i - 1] == "doubt"):
                 valence = valence
-            elif negated([words_and_emoticons_lower[i - (start_i + 1)]]):  # 3 words preceding the lexicon word position
+            elif is_negation(words_and_emoticons_lower[i - (start_i + 1)]):  # 3 words preceding the lexicon word position
                 valence = valence * N_SCALAR
         return valence
 
@@ -475,6 +753,21 @@ class SentimentIntensityAnalyzer(object):
                 neu_count += 1
         return pos_sum, neg_sum, neu_count
 
+    def score_compound(self, sentiments, text):
+        """
+        The compound part of `score_valence` on its own
+        """
+        if not sentiments:
+            return 0.0
+        sum_s = float(sum(sentiments))
+        # compute and add emphasis from punctuation in text
+        punct_emph_amplifier = self._punctuation_emphasis(text)
+        if sum_s > 0:
+            sum_s += punct_emph_amplifier
+        elif sum_s < 0:
+            sum_s -= punct_emph_amplifier
+        return round(normalize(sum_s), 4)
+
     def score_valence(self, sentiments, text):
         if sentiments:
             sum_s = float(sum(sentiments))
@@ -606,7 +899,9 @@ if __name__ == '__main__':
     print(
         "  -- You could use NLTK to break the paragraph into sentence tokens for VADER, then average the results for the paragraph like this: \n")
     # simple example to tokenize paragraph into sentences for VADER
+    import nltk
     from nltk import tokenize
+    nltk.download('punkt_tab')
 
     sentence_list = tokenize.sent_tokenize(paragraph)
     paragraphSentiments = 0.0
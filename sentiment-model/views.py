@@ -1,29 +1,157 @@
+import os
+import nltk
+import numpy as np
+from nltk import tokenize
+from vader.cache import ScoreCache
+from vader.pool import ScoringPool, available_cpus
+from vader.streaming import StreamingScorer
 from vader.vaderSentiment import SentimentIntensityAnalyzer
-analyzer = SentimentIntensityAnalyzer()
+
+# opt-in score caching: number of texts (and of paragraphs) to remember, 0 disables it
+CACHE_SIZE = int(os.environ.get("VADER_CACHE_SIZE", 0))
+# serve the lexicon from the mmap'd snapshot, one page-cache copy shared by every worker process
+MEMORY_MAPPED = os.environ.get("VADER_MEMORY_MAPPED", "").lower() in ("1", "true", "yes")
+# processes used for large batches: "auto" follows the container's CPU quota, 1 keeps scoring in-process
+WORKERS = os.environ.get("VADER_WORKERS", "auto")
+WORKERS = available_cpus() if WORKERS == "auto" else int(WORKERS)
+# batches at least this large are spread over the worker pool
+POOL_MIN_SENTENCES = int(os.environ.get("VADER_POOL_MIN_SENTENCES", 1000))
+POOL_MIN_PARAGRAPHS = int(os.environ.get("VADER_POOL_MIN_PARAGRAPHS", 200))
+# crypto slang merged over the VADER lexicon (empty disables it); edits are picked up without a restart
+OVERLAY_FILE = os.environ.get("VADER_OVERLAY", "crypto_lexicon.txt")
+OVERLAY_CHECK_INTERVAL = float(os.environ.get("VADER_OVERLAY_CHECK_INTERVAL", 5))
+# paragraphs longer than this are scored sentence by sentence as they are tokenized
+STREAM_PARA_CHARS = int(os.environ.get("VADER_STREAM_PARA_CHARS", 100000))
+STREAM_CHUNK_CHARS = 8192
+
+analyzer = SentimentIntensityAnalyzer(cache_size=CACHE_SIZE, memory_mapped=MEMORY_MAPPED,
+                                      overlay_file=OVERLAY_FILE or None,
+                                      overlay_check_interval=OVERLAY_CHECK_INTERVAL)
+para_cache = ScoreCache(CACHE_SIZE) if CACHE_SIZE else None
+pool = ScoringPool(analyzer, workers=WORKERS, min_batch=POOL_MIN_SENTENCES)
+_punkt_checked = False
+
+def ensure_sentence_tokenizer():
+    # the image ships punkt_tab (see Dockerfile); only hit the network when it is missing
+    global _punkt_checked
+    if _punkt_checked:
+        return
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+    except LookupError:
+        nltk.download('punkt_tab', quiet=True)
+    _punkt_checked = True
+
+def get_cache_stats():
+    return {
+        "sentence": analyzer.cache.stats() if analyzer.cache is not None else None,
+        "paragraph": para_cache.stats() if para_cache is not None else None,
+    }
+
+def reload_overlay():
+    changed = analyzer.reload_overlay(force=True)
+    return {"changed": changed, "lexicon_version": analyzer.lexicon_version}
+
+def start_pool():
+    # fork the scoring workers; must run before the app starts any thread (see vader/pool.py)
+    pool.start()
+
+def _compound_score(sentence):
+    return analyzer.compound_score(sentence)
+
+def _score_paragraph_chunk(paragraphs):
+    return score_paragraphs(paragraphs)
+
+def get_sentence_sentiment(sentence):
+    analyzer.check_overlay()
+    return analyzer.compound_score(sentence)
 
 def get_sentence_sentiments(sentences):
-    sentence_sentiments = []
+    analyzer.check_overlay()
+    if pool.active_for(len(sentences)):
+        return pool.map(_compound_score, sentences)
+    return analyzer.compound_scores_batch(sentences, workers=1)
 
-    for sentence in sentences:
-        vs = analyzer.polarity_scores(sentence)
-        sentence_sentiments.append(vs["compound"])
+def stream_para_sentiment(chunks):
+    """
+    Average sentence sentiment of a text supplied as an iterable of chunks,
+    e.g. an open file or a scraper's response stream; only the sentence
+    currently being read is kept in memory
+    """
+    analyzer.check_overlay()
+    ensure_sentence_tokenizer()
+    scorer = StreamingScorer(analyzer, split=tokenize.sent_tokenize)
+    for chunk in chunks:
+        scorer.feed(chunk)
+    scorer.close()
+    return scorer.average
 
-    return sentence_sentiments
+def iter_chunks(text, size=STREAM_CHUNK_CHARS):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+def get_para_sentiment(paragraph):
+    return get_para_sentiments([paragraph])[0]
+
+def score_paragraphs(paragraphs):
+    """
+    Mean sentence compound of each paragraph. All paragraphs are split up
+    front into one flat sentence list with per-paragraph offsets, scored in
+    a single batch and averaged per paragraph; a paragraph with no sentences
+    scores 0.0.
+    """
+    sentences = []
+    offsets = [0]
+    for paragraph in paragraphs:
+        sentences.extend(tokenize.sent_tokenize(paragraph))
+        offsets.append(len(sentences))
+    if not sentences:
+        return [0.0] * len(paragraphs)
+
+    scores = np.asarray(analyzer.compound_scores_batch(sentences, workers=1), dtype=float)
+    counts = np.diff(offsets)
+    # bincount adds each paragraph's scores left to right, exactly like the sequential sum
+    sums = np.bincount(np.repeat(np.arange(len(paragraphs)), counts), weights=scores, minlength=len(paragraphs))
+    non_empty = counts > 0
+    means = np.zeros(len(paragraphs))
+    means[non_empty] = sums[non_empty] / counts[non_empty]
+    return [round(mean, 4) for mean in means.tolist()]
 
 def get_para_sentiments(paragraphs):
-    from nltk import tokenize
+    analyzer.check_overlay()
+    ensure_sentence_tokenizer()
+    # the lexicon these scores are computed with; a reload mid-request must not relabel them
+    version = analyzer.lexicon_version
+    para_sentiments = [None] * len(paragraphs)
+    keys = {}
+    batch = []
 
-    para_sentiments = []
+    for idx, paragraph in enumerate(paragraphs):
+        if para_cache is not None:
+            key = ScoreCache.key(paragraph, "paragraph")
+            para_sentiments[idx] = para_cache.get(key, version)
+            if para_sentiments[idx] is not None:
+                continue
+            keys[idx] = key
+        if len(paragraph) > STREAM_PARA_CHARS:
+            para_sentiments[idx] = stream_para_sentiment(iter_chunks(paragraph))
+        else:
+            batch.append(idx)
 
-    for paragraph in paragraphs:
-        sentence_list = tokenize.sent_tokenize(paragraph)
-        para_sentiment = 0.0
+    batch_paragraphs = [paragraphs[idx] for idx in batch]
+    if len(batch) >= POOL_MIN_PARAGRAPHS and pool.started:
+        # each worker tokenizes and scores a contiguous slice, so results stay in order
+        size = -(-len(batch) // (pool.workers * 4))
+        chunks = [batch_paragraphs[i:i + size] for i in range(0, len(batch), size)]
+        batch_scores = [score for chunk in pool.map(_score_paragraph_chunk, chunks, 1) for score in chunk]
+    else:
+        batch_scores = score_paragraphs(batch_paragraphs)
 
-        for sentence in sentence_list:
-            vs = analyzer.polarity_scores(sentence)
-            para_sentiment += vs["compound"]
+    for idx, avg_para_sentiment in zip(batch, batch_scores):
+        para_sentiments[idx] = avg_para_sentiment
 
-        avg_para_sentiment = round(para_sentiment / len(sentence_list), 4)
-        para_sentiments.append(avg_para_sentiment)
+    if para_cache is not None:
+        for idx, key in keys.items():
+            para_cache.put(key, para_sentiments[idx], version)
 
     return para_sentiments
@@ -22,27 +22,19 @@ DB_CONFIG = {
 def get_db_connection():
     return psycopg2.connect(**DB_CONFIG)
 
-# Sentiment API integration
-import requests
+# Sentiment API integration: one pooled keep-alive client, posts are scored in batches
+from sentiment_client import SentimentClient
 
-SENTIMENT_API_URL = "https://sentiment-app-877042335787.us-central1.run.app/para-sentiment-analyze"
+sentiment_client = SentimentClient()
 
 def get_sentiment_score(text):
     if not text or not text.strip():
         print("Empty or invalid text for sentiment analysis. Skipping.")
         return None
-    try:
-        response = requests.post(SENTIMENT_API_URL, json=[text])
-        if response.status_code == 200:
-            sentiments = response.json()
-            if sentiments and isinstance(sentiments, list):
-                return sentiments[0]
-            return None
-        else:
-            print(f"Sentiment API failed with status {response.status_code}: {response.text}")
-    except Exception as e:
-        print(f"Error calling sentiment API: {str(e)}")
-    return None
+    return sentiment_client.score(text)
+
+def get_sentiment_scores(texts):
+    return sentiment_client.score_many(texts)
 
 def get_coins():
     print("Fetching coins from DB...")
@@ -235,6 +227,10 @@ def reddit_db_dump():
             print("No posts returned from fetch_reddit_posts.")
             return {"status": "success", "message": "No posts to insert."}
 
+        contents = [f"{post['title']} {post['text']}" for post in posts]
+        scores = get_sentiment_scores(contents)
+        print(f"Scored {sum(score is not None for score in scores)} of {len(posts)} posts")
+
         conn = get_db_connection()
         print("Database connection established.")
 
@@ -247,7 +243,7 @@ def reddit_db_dump():
 
         cur = conn.cursor()
         inserted_count = 0
-        for post in posts:
+        for post, content, sentiment_score in zip(posts, contents, scores):
             try:
                 # If connection or cursor closed, reopen
                 if conn.closed != 0 or cur.closed:
@@ -262,8 +258,8 @@ def reddit_db_dump():
                     post["question_id"],
                     post["coin_id"],
                     post["author"],
-                    f"{post['title']} {post['text']}",
-                    get_sentiment_score(f"{post['title']} {post['text']}"),
+                    content,
+                    sentiment_score,
                     post["timestamp"],
                     datetime.now(timezone.utc).isoformat(),
                     json.dumps({
@@ -284,8 +280,8 @@ def reddit_db_dump():
                     post["question_id"],
                     post["coin_id"],
                     post["author"],
-                    f"{post['title']} {post['text']}",
-                    get_sentiment_score(f"{post['title']} {post['text']}"),
+                    content,
+                    sentiment_score,
                     post["timestamp"],
                     datetime.now(timezone.utc).isoformat(),
                     json.dumps({
@@ -2,6 +2,8 @@ import csv
 import json
 import requests
 
+# Small dumps only: everything is held in memory and sent in one request. For the full
+# corpus use sentiment-model/bulk_score.py, which streams the file and can resume.
 input_file = "neondb_public_crypto_news.json"
 csv_file = "scores.csv"
 
@@ -0,0 +1,63 @@
+"""
+Client for the sentiment-model service.
+
+One `requests.Session` is kept per client, so connections to the service are
+pooled and kept alive instead of being opened for every post. Texts are sent
+to /para-sentiment-analyze `batch_size` at a time and the scores are mapped
+back to the input positions; blank texts are never sent and score None, as
+does every text of a batch that failed. Each call is bounded by a connect and
+a read timeout, and transient gateway errors are retried with backoff.
+"""
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_URL = "https://sentiment-app-877042335787.us-central1.run.app/para-sentiment-analyze"
+
+
+class SentimentClient:
+    def __init__(self, url=None, batch_size=None, connect_timeout=None, read_timeout=None, retries=2,
+                 pool_size=4):
+        self.url = url or os.getenv("SENTIMENT_API_URL", DEFAULT_URL)
+        self.batch_size = batch_size or int(os.getenv("SENTIMENT_BATCH_SIZE", 100))
+        self.timeout = (connect_timeout or float(os.getenv("SENTIMENT_CONNECT_TIMEOUT", 5)),
+                        read_timeout or float(os.getenv("SENTIMENT_READ_TIMEOUT", 30)))
+        self.session = requests.Session()
+        # scoring is idempotent, so POSTs may be retried too
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504),
+                      allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _score_batch(self, texts):
+        try:
+            response = self.session.post(self.url, json=texts, timeout=self.timeout)
+            if response.status_code == 200:
+                sentiments = response.json()
+                if isinstance(sentiments, list) and len(sentiments) == len(texts):
+                    return sentiments
+                print(f"Sentiment API returned {len(sentiments) if isinstance(sentiments, list) else 'no'} "
+                      f"scores for {len(texts)} texts")
+            else:
+                print(f"Sentiment API failed with status {response.status_code}: {response.text}")
+        except Exception as e:
+            print(f"Error calling sentiment API: {str(e)}")
+        return [None] * len(texts)
+
+    def score_many(self, texts):
+        """Sentiment score for each text, in order (None for blank texts and failed batches)."""
+        scores = [None] * len(texts)
+        pending = [idx for idx, text in enumerate(texts) if text and text.strip()]
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            for idx, score in zip(batch, self._score_batch([texts[idx] for idx in batch])):
+                scores[idx] = score
+        return scores
+
+    def score(self, text):
+        return self.score_many([text])[0]
+
+    def close(self):
+        self.session.close()
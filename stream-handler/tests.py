@@ -110,7 +110,7 @@ def test_reddit_db_dump_success(client, mocker):
         "num_comments": 10,
         "coin": "BTC"
     }])
-    mocker.patch('app.get_sentiment_score', return_value=0.8)
+    mocker.patch('app.get_sentiment_scores', return_value=[0.8])
 
     response = client.post('/reddit_db_dump', json={"limit": 1, "time_filter": "day"})
     assert response.status_code == 200
@@ -122,4 +122,26 @@ def test_test_insert_success(client, mocker):
 
     response = client.post('/test_insert')
     assert response.status_code == 200
-    assert response.get_json()["status"] == "success"
\ No newline at end of file
+    assert response.get_json()["status"] == "success"
+
+# 9. Test the sentiment client batches posts over one session and maps scores back in order
+def test_sentiment_client_batches():
+    from sentiment_client import SentimentClient
+
+    client = SentimentClient(url="http://sentiment/para-sentiment-analyze", batch_size=2)
+    posts = []
+    def post(url, json, timeout):
+        posts.append(json)
+        response = MagicMock(status_code=200)
+        response.json.return_value = [len(text) / 10 for text in json]
+        return response
+    client.session.post = MagicMock(side_effect=post)
+
+    assert client.score_many(["a", "", "bbb", "  ", "cc", "dddd"]) == [0.1, None, 0.3, None, 0.2, 0.4]
+    assert posts == [["a", "bbb"], ["cc", "dddd"]]
+    assert client.session.post.call_args.kwargs["timeout"] == client.timeout
+
+    client.session.post = MagicMock(return_value=MagicMock(status_code=503, text="busy"))
+    assert client.score_many(["a", "b", "c"]) == [None, None, None]
+    client.session.post = MagicMock(side_effect=Exception("read timeout"))
+    assert client.score("a") is None